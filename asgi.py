@@ -0,0 +1,5 @@
+"""ASGI entry point, e.g. ``uvicorn asgi:app``: async views for the read-heavy routes (see ``asgi_app.py``)."""
+from app import create_app
+from asgi_app import AsyncApp
+
+app = AsyncApp(create_app())
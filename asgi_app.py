@@ -0,0 +1,211 @@
+"""ASGI serving mode: async views on an asyncio engine, the WSGI app for the rest.
+
+Under a WSGI server every in-flight request holds a thread while it waits on
+the database. ``AsyncApp`` wraps the Flask app for an ASGI server (see
+``asgi.py``) and serves the read-heavy GET routes registered in
+``async_views`` as coroutines on the event loop, with their queries awaited on
+an ``AsyncSession`` (aiosqlite for SQLite, see
+``database.create_async_engine_for``). A waiting request then costs a task,
+not a thread.
+
+Only logged-in GET/HEAD requests for those endpoints take the async path. They
+still run through the Flask app's own machinery - request context, session
+cookie, ``before_request``/``after_request`` hooks, error handlers - so the
+responses match WSGI mode. The user is loaded by Flask-Login itself, with its
+session protection and Flask-Security's user and request loaders, on a worker
+thread; when that yields no authenticated user the request goes to WSGI.
+Rendering and the page cache run on worker threads too, so the event loop
+only ever waits on the async queries. Everything else (forms, logins,
+anonymous visitors, the other pages) runs the WSGI app on a pool of
+ASGI_WSGI_THREADS threads, as a threaded WSGI server would.
+
+The async path always reads the primary; read replicas are only used by the
+WSGI app.
+"""
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_login import current_user
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from werkzeug.exceptions import HTTPException
+
+from async_views import views as async_views
+from database import create_async_engine_for
+from extensions import db
+from instrumentation import count_queries
+
+ASYNC_METHODS = ('GET', 'HEAD')
+
+
+def wsgi_environ(scope, body=b''):
+    """WSGI environ for an ASGI HTTP request whose body has been read into `body`."""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode().decode('latin1'),
+        'PATH_INFO': path.encode().decode('latin1'),  # WSGI carries the UTF-8 bytes as latin-1
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': (scope.get('client') or ('',))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f'HTTP_{name}'
+        value = value.decode('latin1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncApp:
+    """ASGI application serving `app` with the async views where possible."""
+
+    def __init__(self, app, views=None):
+        self.app = app
+        self.views = async_views if views is None else views
+        self.executor = ThreadPoolExecutor(max_workers=app.config.get('ASGI_WSGI_THREADS', 32),
+                                           thread_name_prefix='wsgi')
+        self.engine = create_async_engine_for(app, db)
+        count_queries(self.engine.sync_engine)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.stats = {'async': 0, 'wsgi': 0}
+        app.extensions['asgi'] = self
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['method'] in ASYNC_METHODS and await self._serve_async(scope, send):
+            self.stats['async'] += 1
+        else:
+            self.stats['wsgi'] += 1
+            await self._serve_wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _serve_async(self, scope, send):
+        """Serve the request with an async view; return False, having sent nothing, to leave it to WSGI."""
+        environ = wsgi_environ(scope)
+        try:
+            endpoint, view_args = self.app.url_map.bind_to_environ(
+                environ, server_name=self.app.config['SERVER_NAME']
+            ).match()
+        except HTTPException:
+            return False  # 404, 405 or a redirect: the WSGI app answers those
+        view = self.views.get(endpoint)
+        if view is None:
+            return False
+        ctx = self.app.request_context(environ)
+        ctx.push()
+        try:
+            if not await self._load_user():
+                return False  # Anonymous, or the session failed Flask-Login's checks: WSGI answers as usual
+            async with self.sessions() as session:
+                response = await self._dispatch(view, session, view_args)
+            await self._send(response, environ, send)
+            return True
+        finally:
+            ctx.pop()
+
+    async def _serve_wsgi(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return  # No websockets here
+        body = bytearray()
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if message['type'] != 'http.request' or not message.get('more_body'):
+                break
+        environ = wsgi_environ(scope, bytes(body))
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            started = []
+
+            def start_response(status, headers, exc_info=None):
+                started[:] = [status, headers]  # Sent with the first chunk, so error handlers may still replace it
+
+            chunks = self.app(environ, start_response)
+            try:
+                for chunk in chunks:
+                    if chunk:
+                        if started:
+                            send_from_thread(_start_message(*started))
+                            started.clear()
+                        send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                if started:
+                    send_from_thread(_start_message(*started))
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+            send_from_thread({'type': 'http.response.body', 'body': b''})
+
+        await loop.run_in_executor(self.executor, run)
+
+    @staticmethod
+    async def _load_user():
+        # Flask-Login's own path - session protection, user_loader (the identity cache, see identity.py),
+        # request_loader - on a thread, as its loaders use the sync session; it stores the user on g
+        user = await asyncio.to_thread(current_user._get_current_object)
+        return user.is_authenticated
+
+    async def _dispatch(self, view, session, view_args):
+        # Flask.full_dispatch_request with an awaited view
+        app = self.app
+        try:
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    rv = await view(session, **view_args)
+            except Exception as error:
+                rv = app.handle_user_exception(error)
+            return app.finalize_request(rv)
+        except Exception as error:
+            return app.handle_exception(error)
+
+    @staticmethod
+    async def _send(response, environ, send):
+        body, status, headers = response.get_wsgi_response(environ)
+        await send(_start_message(status, headers))
+        try:
+            for chunk in body:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def _start_message(status, headers):
+    """ASGI response start for a WSGI status line and header list."""
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    }
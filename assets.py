@@ -0,0 +1,217 @@
+"""Fingerprinted, minified and precompressed static assets.
+
+``flask assets build`` walks ``static/``, minifies CSS and JavaScript, names
+each output after a hash of its content (``css/style.css`` becomes
+``css/style.3f2a9c01b7de.css``), writes gzip and brotli siblings, and records
+the mapping in ``manifest.json`` inside ASSETS_BUILD_DIR. Relative ``url()``
+references in stylesheets are rewritten to the fingerprinted names.
+
+Templates call ``asset_url('css/style.css')``. With a manifest it returns the
+``/assets/...`` URL of the fingerprinted file, served in the best encoding the
+client accepts with ``Cache-Control: public, max-age=31536000, immutable`` -
+a changed file gets a new name, so browsers never need to revalidate. Without
+a build (a fresh checkout in development) it falls back to the plain
+``/static/...`` URL.
+
+Files from earlier builds are kept so pages cached before a deploy still find
+their assets; ``--clean`` removes everything the current manifest does not
+reference.
+"""
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import time
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+from werkzeug.exceptions import NotFound
+
+from compression import ENCODINGS, compressors, negotiate, write_atomic, write_variants
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:  # Optional: fall back to the conservative built-in minifiers
+    rcssmin = rjsmin = None
+
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html', '.xml')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s*([{};,>])\s*')  # Not ':' - "a :hover" and "a:hover" are different selectors
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def minify_css(source):
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    source = _CSS_COMMENT.sub('', source)
+    source = _CSS_SPACE.sub(r'\1', ' '.join(source.split()))
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    # Without a tokenizer only whitespace-only changes are safe: strings, regexes and ASI stay intact
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+class AssetPipeline:
+
+    def __init__(self, app=None):
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._checked = float('-inf')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.source_dir = app.static_folder
+        self.build_dir = os.path.join(app.root_path, app.config.get('ASSETS_BUILD_DIR', 'build/assets'))
+        self.max_age = app.config.get('ASSETS_MAX_AGE', 31536000)
+        app.extensions['assets'] = self
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.send_asset)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def manifest(self):
+        """The build manifest, re-read (checked at most once a second) when a build has replaced it."""
+        now = time.monotonic()
+        if now - self._checked < 1.0:
+            return self._manifest
+        self._checked = now
+        path = os.path.join(self.build_dir, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._manifest = {}
+            return self._manifest
+        if mtime != self._manifest_mtime:
+            with open(path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    @property
+    def version(self):
+        """Digest of the current manifest; changes whenever any asset does."""
+        return self.manifest().get('version', '')
+
+    def url(self, filename):
+        built = self.manifest().get('files', {}).get(filename)
+        if built is None:
+            return url_for('static', filename=filename)  # Not built yet: serve the source file
+        return url_for('assets', filename=built['path'])
+
+    def send_asset(self, filename):
+        entry = self.manifest().get('built', {}).get(filename)
+        if entry is None:
+            raise NotFound()
+        encoding, suffix = negotiate(request.accept_encodings, entry['encodings'])
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        # The name changes with the content, so no validators are needed: the response never goes stale
+        response = send_from_directory(self.build_dir, filename + suffix, mimetype=mimetype, etag=False,
+                                       conditional=False)
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        return response
+
+    # Building
+
+    def _sources(self):
+        build_dir = os.path.realpath(self.build_dir)
+        for dirpath, dirnames, filenames in os.walk(self.source_dir):
+            dirnames[:] = sorted(d for d in dirnames if os.path.realpath(os.path.join(dirpath, d)) != build_dir)
+            for filename in sorted(filenames):
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                yield os.path.relpath(path, self.source_dir).replace(os.sep, '/'), path
+
+    def build(self, clean=False):
+        self._checked = float('-inf')  # Compare against the manifest on disk, not a cached copy
+        available = compressors()
+        files, built = {}, {}
+        sources = sorted(self._sources(), key=lambda item: item[0].endswith('.css'))  # Stylesheets last, for url() rewriting
+        for name, path in sources:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if name.endswith('.css'):
+                data = minify_css(self._rewrite_css_urls(name, data.decode(), files)).encode()
+            elif name.endswith('.js'):
+                data = minify_js(data.decode()).encode()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            stem, ext = posixpath.splitext(name)
+            target = f'{stem}.{digest}{ext}'
+            output = os.path.join(self.build_dir, target)
+            previous = self.manifest().get('built', {}).get(target)
+            if previous is not None and os.path.exists(output):
+                encodings = previous['encodings']  # Same content hash: already written
+            elif name.endswith(COMPRESSIBLE):
+                encodings = write_variants(output, data, available, only_if_smaller=True)
+            else:
+                write_atomic(output, data)
+                encodings = []
+            files[name] = {'path': target, 'size': len(data)}
+            built[target] = {'source': name, 'encodings': encodings}
+
+        if not clean:
+            # Keep earlier builds' files servable for pages and caches that still reference them
+            for target, entry in self.manifest().get('built', {}).items():
+                if os.path.exists(os.path.join(self.build_dir, target)):
+                    built.setdefault(target, entry)
+        else:
+            self._remove_unreferenced(built)
+
+        version = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()[:12]
+        write_atomic(os.path.join(self.build_dir, MANIFEST),
+                     json.dumps({'version': version, 'files': files, 'built': built}, indent=1, sort_keys=True).encode())
+        self._checked = float('-inf')
+        return files
+
+    def _rewrite_css_urls(self, name, source, files):
+        base = posixpath.dirname(name)
+
+        def replace(match):
+            quote, target = match.groups()
+            if re.match(r'^(?:[a-z]+:|/|#)', target):
+                return match.group(0)  # Absolute, data: or fragment URLs are left alone
+            path, _, suffix = target.partition('?')
+            resolved = posixpath.normpath(posixpath.join(base, path))
+            if resolved not in files:
+                return match.group(0)
+            relative = posixpath.relpath(files[resolved]['path'], base or '.')
+            return f'url({quote}{relative}{"?" + suffix if suffix else ""}{quote})'
+        return _CSS_URL.sub(replace, source)
+
+    def _remove_unreferenced(self, built):
+        for dirpath, _, filenames in os.walk(self.build_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                relative = os.path.relpath(path, self.build_dir).replace(os.sep, '/')
+                for _, suffix in ENCODINGS:
+                    if relative.endswith(suffix):
+                        relative = relative[:-len(suffix)]
+                        break
+                if relative != MANIFEST and relative not in built:
+                    os.remove(path)
+
+
+assets_cli = AppGroup('assets', help='Static asset pipeline.')
+
+
+@assets_cli.command('build')
+@click.option('--clean', is_flag=True, help='Delete fingerprinted files the new manifest does not reference.')
+def build_command(clean):
+    """Fingerprint, minify and precompress everything under static/."""
+    pipeline = current_app.extensions['assets']
+    files = pipeline.build(clean=clean)
+    for name, entry in files.items():
+        click.echo(f"{name} -> {entry['path']} ({entry['size']} bytes)")
+    click.echo(f'Built {len(files)} assets into {pipeline.build_dir}.')
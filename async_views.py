@@ -0,0 +1,130 @@
+"""Async variants of the read-heavy ``main`` views, served by ``asgi_app.AsyncApp``.
+
+Each view is registered under the endpoint of the sync view it replaces, so
+``url_for``, the templates and every link stay the same. A view receives the
+request's ``AsyncSession`` and awaits its queries instead of blocking a
+thread on them; rendering, caching and validators are shared with the sync
+views. Whatever still blocks - rendering, the page cache (possibly SQLite),
+frozen snapshots on disk - runs through ``asyncio.to_thread`` so the event
+loop keeps serving other requests meanwhile.
+
+Nothing may be lazy-loaded on an async session: every relationship or
+deferred column a template reads is loaded up front.
+"""
+import asyncio
+import calendar
+from datetime import datetime
+
+from flask import abort, current_app, make_response, render_template, request
+from flask_login import current_user
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, selectinload
+
+from conditional import conditional_allowed, make_etag, not_modified, set_validators
+from extensions import db, page_cache, snapshots
+from models import ArchiveMonth, Blog, Tag, User, blog_tags
+from pagination import clamp_page_size, keyset_paginate_async
+from rendering import ensure_html, html_is_current, post_version
+
+views = {}  # endpoint -> async view(session, **view_args)
+
+
+def async_view(endpoint):
+    def decorator(view):
+        views[endpoint] = view
+        return view
+    return decorator
+
+
+async def _post_list(session, stmt, **context):
+    # Same page as views._stream_post_list, fetched in one round-trip rather than streamed
+    config = current_app.config
+    page_size = clamp_page_size(request.args.get('per_page'), config['BLOG_PAGE_SIZE'], config['BLOG_MAX_PAGE_SIZE'])
+    stmt = stmt.options(load_only(Blog.id, Blog.title, Blog.date_posted, Blog.excerpt, Blog.reading_time))
+    try:
+        page = await keyset_paginate_async(session, stmt, Blog.date_posted, Blog.id, page_size,
+                                           request.args.get('after'))
+    except ValueError:
+        abort(400)  # Malformed ?after= cursor
+    return await asyncio.to_thread(render_template, 'blog_list.html', blogs=page, **context)
+
+
+@async_view('main.dashboard')
+async def dashboard(session):
+    # Volatile, so not part of the cached identity: always read fresh
+    posts_version = await session.scalar(select(User.posts_version).where(User.id == current_user.id))
+    etag = make_etag('dashboard', current_user.id, posts_version, request.query_string)
+    response = not_modified(etag)
+    if response is not None:
+        return response
+    html = await _post_list(session, select(Blog).where(Blog.author_id == current_user.id), title='Dashboard')
+    return set_validators(make_response(html), etag) if conditional_allowed() else html
+
+
+@async_view('main.blog')
+async def blog(session, blog_id):
+    updated_at = await session.scalar(select(Blog.updated_at).where(Blog.id == blog_id))
+    if updated_at is None:
+        abort(404)
+    cache_key, version = f'blog:{blog_id}', post_version(updated_at)
+    etag = make_etag(cache_key, version)
+    response = not_modified(etag, updated_at)
+    if response is not None:
+        return response
+    cacheable = conditional_allowed()
+    if cacheable:
+        response = await asyncio.to_thread(snapshots.response, f'/blog/{blog_id}', version)
+        if response is not None:
+            return set_validators(response, etag, updated_at)
+    html = await asyncio.to_thread(page_cache.get, cache_key, version) if cacheable else None
+    if html is None:
+        blog = await session.scalar(select(Blog).options(selectinload(Blog.tags)).where(Blog.id == blog_id))
+        if blog is None:
+            abort(404)
+        if not html_is_current(blog):
+            await asyncio.to_thread(ensure_html, db, Blog, blog)  # Rare; writes through the sync engine
+        html = await asyncio.to_thread(render_template, 'blog_detail.html', title=blog.title, blog=blog)
+        if cacheable:
+            await asyncio.to_thread(page_cache.set, cache_key, version, html)
+    if not cacheable:
+        return html
+    return set_validators(make_response(html), etag, updated_at)
+
+
+@async_view('main.tags')
+async def tags(session):
+    tags = (await session.scalars(
+        select(Tag).where(Tag.post_count > 0)
+        .order_by(Tag.post_count.desc(), Tag.name).limit(current_app.config['TAG_LIST_SIZE'])
+    )).all()
+    return await asyncio.to_thread(render_template, 'tags.html', title='Tags', tags=tags)
+
+
+@async_view('main.tag')
+async def tag(session, slug):
+    tag = await session.scalar(select(Tag).where(Tag.slug == slug))
+    if tag is None:
+        abort(404)
+    stmt = select(Blog).join(blog_tags, blog_tags.c.blog_id == Blog.id).where(blog_tags.c.tag_id == tag.id)
+    return await _post_list(session, stmt, title=tag.name, heading=f'Tagged "{tag.name}"')
+
+
+@async_view('main.archive')
+async def archive(session):
+    months = (await session.scalars(
+        select(ArchiveMonth).where(ArchiveMonth.post_count > 0)
+        .order_by(ArchiveMonth.year.desc(), ArchiveMonth.month.desc())
+    )).all()
+    return await asyncio.to_thread(render_template, 'archive.html', title='Archive', months=months,
+                                   month_names=calendar.month_name)
+
+
+@async_view('main.archive_month')
+async def archive_month(session, year, month):
+    try:
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+    except ValueError:
+        abort(404)
+    stmt = select(Blog).where(Blog.date_posted >= start, Blog.date_posted < end)
+    return await _post_list(session, stmt, title=start.strftime('%B %Y'), heading=start.strftime('%B %Y'))
@@ -0,0 +1,7 @@
+"""Load-testing and benchmark suite for the blog routes.
+
+Run ``python -m benchmarks --help`` from the repository root. The suite seeds a
+throwaway SQLite database, drives the app through the Flask test client and/or
+a real threaded WSGI server, and reports latency percentiles, throughput,
+query counts and peak memory per route and concurrency level.
+"""
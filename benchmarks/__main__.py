@@ -0,0 +1,130 @@
+"""Command-line entry point: ``python -m benchmarks``."""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from benchmarks import seed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__)
+    parser.add_argument('--users', type=int, default=10, help='Accounts to seed.')
+    parser.add_argument('--posts', type=int, default=1000, help='Posts to seed.')
+    parser.add_argument('--content-size', type=int, default=2000, help='Characters per seeded post.')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route and concurrency level.')
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated concurrency levels.')
+    parser.add_argument('--mode', choices=['client', 'server', 'asgi', 'both', 'all'], default='both',
+                        help='Flask test client, threaded WSGI server, uvicorn with the async views (asgi), '
+                             'client and server (both), or all three.')
+    parser.add_argument('--routes', default=None, help='Comma-separated subset of routes to run.')
+    parser.add_argument('--memory-requests', type=int, default=20,
+                        help='Sequential requests traced for peak memory (0 to skip).')
+    parser.add_argument('--storm-threads', type=int, default=0,
+                        help='Threads posting /register in the background while the other routes run.')
+    parser.add_argument('--db-latency', type=float, default=0,
+                        help='Milliseconds added to every SQL statement, to model a database across the network.')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this file.')
+    parser.add_argument('--baseline', default=None, help='Compare against a previous results file.')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed p95 slowdown versus the baseline before failing (0.15 = 15%%).')
+    return parser.parse_args(argv)
+
+
+def compare(results, baseline, tolerance):
+    """Print deltas against a baseline and return the regressions found."""
+    previous = {(r['mode'], r['route'], r['concurrency']): r for r in baseline['results']}
+    regressions = []
+    print('\nComparison with baseline (p95 ms, throughput rps):')
+    for result in results:
+        key = (result['mode'], result['route'], result['concurrency'])
+        before = previous.get(key)
+        if before is None:
+            continue
+        ratio = result['p95_ms'] / before['p95_ms'] if before['p95_ms'] else 1.0
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        print(f'  {key[0]:6} {key[1]:10} c={key[2]:<3} p95 {before["p95_ms"]:9.2f} -> {result["p95_ms"]:9.2f}'
+              f' ({(ratio - 1) * 100:+.1f}%)  rps {before["throughput_rps"]:8.1f} -> {result["throughput_rps"]:8.1f}{flag}')
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = seed.prepare_environment()
+
+    from app import create_app
+    from benchmarks.runner import (AsgiServerDriver, RegistrationStorm, ServerDriver, TestClientDriver,
+                                   default_scenarios, measure_peak_memory, run_scenario, simulate_db_latency)
+
+    app = create_app()  # Created after the environment points it at the benchmark database
+    app.config['WTF_CSRF_ENABLED'] = False  # Benchmarks post forms directly
+
+    started = time.perf_counter()
+    emails = seed.seed(app, users=args.users, posts=args.posts, content_size=args.content_size)
+    print(f'Seeded {args.users} users / {args.posts} posts in {time.perf_counter() - started:.1f}s ({workdir})')
+    if args.db_latency:
+        simulate_db_latency(app, args.db_latency / 1000)  # After seeding, which would otherwise crawl
+
+    scenarios = default_scenarios(args.posts)
+    if args.routes:
+        wanted = set(args.routes.split(','))
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    modes = {'both': ['client', 'server'], 'all': ['client', 'server', 'asgi']}.get(args.mode, [args.mode])
+    drivers = {'client': TestClientDriver, 'server': ServerDriver, 'asgi': AsgiServerDriver}
+
+    results = []
+    print(f'{"mode":6} {"route":10} {"conc":>4} {"p50":>9} {"p95":>9} {"p99":>9} {"rps":>9} {"queries":>7} {"peak KiB":>9} {"err":>4}')
+    for mode in modes:
+        driver = drivers[mode](app)
+        try:
+            for scenario in scenarios:
+                peak = measure_peak_memory(driver, scenario, emails, args.memory_requests) \
+                    if args.memory_requests else None
+                for level in levels:
+                    storm_threads = args.storm_threads if scenario.name != 'register' else 0
+                    with RegistrationStorm(driver, storm_threads):
+                        result = run_scenario(driver, scenario, emails, args.requests, level)
+                    result['peak_memory_kib'] = peak
+                    result['storm_threads'] = storm_threads
+                    results.append(result)
+                    print(f'{mode:6} {scenario.name:10} {level:>4} {result["p50_ms"]:>9.2f} {result["p95_ms"]:>9.2f}'
+                          f' {result["p99_ms"]:>9.2f} {result["throughput_rps"]:>9.1f}'
+                          f' {result["queries_per_request"] if result["queries_per_request"] is not None else "-":>7}'
+                          f' {peak if peak is not None else "-":>9} {result["errors"]:>4}')
+        finally:
+            if hasattr(driver, 'close'):
+                driver.close()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'users': args.users,
+            'posts': args.posts,
+            'content_size': args.content_size,
+            'requests': args.requests,
+            'storm_threads': args.storm_threads,
+            'db_latency_ms': args.db_latency,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
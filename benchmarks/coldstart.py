@@ -0,0 +1,128 @@
+"""Measure worker cold start and enforce a start-up budget: ``python -m benchmarks.coldstart``.
+
+Each run starts a fresh interpreter and times importing the ``app`` module,
+``create_app()`` and the first successful responses, under three template
+set-ups:
+
+* ``lazy``      - no bytecode cache, no precompilation (templates compile on
+  first use);
+* ``precompile`` - every template compiled from source at start-up;
+* ``bytecode``  - precompilation from a warm bytecode cache, as a restarted or
+  newly scaled-out worker on a host that has already run once would see.
+
+It also times a bare ``flask --help``, which every CLI invocation pays.
+With ``--max-import-ms``, ``--max-startup-ms`` or ``--max-cli-ms`` the run
+exits non-zero when the ``bytecode`` medians exceed the budget, so CI can keep
+worker boot and CLI start-up from creeping up. ``tests/test_coldstart.py``
+checks the import budget on its own as part of the pytest run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import seed
+
+VARIANTS = {
+    'lazy': {'TEMPLATE_BYTECODE_CACHE': 'none', 'TEMPLATE_PRECOMPILE': 'false'},
+    'precompile': {'TEMPLATE_BYTECODE_CACHE': 'none', 'TEMPLATE_PRECOMPILE': 'true'},
+    'bytecode': {'TEMPLATE_BYTECODE_CACHE': 'filesystem', 'TEMPLATE_PRECOMPILE': 'true'},
+}
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app()
+created = time.perf_counter()
+client = app.test_client()
+statuses = [client.get(path).status_code for path in sys.argv[1:]]
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'startup_ms': (created - started) * 1000,
+    'first_response_ms': (done - started) * 1000,
+    'statuses': statuses,
+    'template_cache': app.extensions['template_cache'].info(),
+}))
+"""
+
+COLUMNS = ('import_ms', 'create_ms', 'startup_ms', 'first_response_ms')
+
+
+def run_child(env, paths):
+    output = subprocess.run([sys.executable, '-c', CHILD, *paths], env=env, check=True,
+                            capture_output=True, text=True, cwd=os.getcwd()).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_cli(env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', '--help'], env=env, check=True,
+                   capture_output=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.coldstart', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per variant.')
+    parser.add_argument('--paths', default='/,/about,/register',
+                        help='Comma-separated requests made by each new process; all must succeed.')
+    parser.add_argument('--max-import-ms', type=float, default=None, help='Budget for `import app`.')
+    parser.add_argument('--max-startup-ms', type=float, default=None, help='Budget for import plus create_app().')
+    parser.add_argument('--max-cli-ms', type=float, default=None, help='Budget for a bare `flask --help`.')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    workdir = seed.prepare_environment()
+    os.environ['FREEZE_SERVE'] = 'false'  # Measure rendering, not snapshot serving
+    os.environ['TEMPLATE_CACHE_DIR'] = os.path.join(workdir, 'jinja_cache')
+    paths = args.paths.split(',')
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'], check=True,
+                   capture_output=True, env=os.environ)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'templates', 'compile'], check=True,
+                   capture_output=True, env={**os.environ, **VARIANTS['bytecode']})  # Warm the bytecode cache
+
+    results = {}
+    print(f'{"variant":11} {"import ms":>10} {"create ms":>10} {"startup ms":>11} {"first resp ms":>14}'
+          f' {"precompile ms":>14}')
+    for name, overrides in VARIANTS.items():
+        env = {**os.environ, **overrides}
+        runs = [run_child(env, paths) for _ in range(args.runs)]
+        bad = [run['statuses'] for run in runs if any(status >= 400 for status in run['statuses'])]
+        if bad:
+            raise SystemExit(f'{name}: unsuccessful responses {bad}')
+        summary = {key: round(statistics.median(run[key] for run in runs), 2) for key in COLUMNS}
+        summary['precompile_ms'] = round(statistics.median(
+            run['template_cache']['precompile_seconds'] for run in runs) * 1000, 2)
+        results[name] = summary
+        print(f'{name:11} {summary["import_ms"]:>10.1f} {summary["create_ms"]:>10.1f} {summary["startup_ms"]:>11.1f}'
+              f' {summary["first_response_ms"]:>14.1f} {summary["precompile_ms"]:>14.1f}')
+
+    cli_ms = round(statistics.median(time_cli({**os.environ, **VARIANTS['bytecode']}) for _ in range(args.runs)), 2)
+    print(f'\nflask --help: {cli_ms:.1f} ms')
+
+    budget_failures = []
+    for label, limit, value in (('import', args.max_import_ms, results['bytecode']['import_ms']),
+                                ('startup', args.max_startup_ms, results['bytecode']['startup_ms']),
+                                ('cli', args.max_cli_ms, cli_ms)):
+        if limit is not None and value > limit:
+            budget_failures.append(f'{label} {value:.1f} ms > {limit:.1f} ms')
+    for failure in budget_failures:
+        print(f'OVER BUDGET: {failure}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'paths': paths, 'runs': args.runs, 'results': results, 'cli_ms': cli_ms}, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    return 1 if budget_failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Drive the app with concurrent clients and collect per-route statistics."""
+import asyncio
+import http.client
+import itertools
+import math
+import random
+import socket
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from sqlalchemy import event
+from werkzeug.serving import make_server
+
+from benchmarks.seed import BENCH_PASSWORD
+
+_counter = itertools.count()
+
+
+class Scenario:
+    """One benchmarked route: how to build a request and whether it needs a logged-in client."""
+
+    def __init__(self, name, method, path, data=None, login=True):
+        self.name = name
+        self.method = method
+        self.path = path  # callable(rng) -> path
+        self.data = data  # callable(rng) -> form dict, for POSTs
+        self.login = login
+
+
+def default_scenarios(post_count):
+    def unique_email(rng):
+        return f'new{next(_counter)}-{rng.randrange(1 << 30)}@example.com'
+
+    def registration(rng):
+        email = unique_email(rng)
+        return {'email': email, 'password': 'pw-benchmark', 'confirm_password': 'pw-benchmark'}
+
+    return [
+        Scenario('index', 'GET', lambda rng: '/', login=False),
+        Scenario('dashboard', 'GET', lambda rng: '/dashboard'),
+        Scenario('blog', 'GET', lambda rng: f'/blog/{rng.randint(1, post_count)}'),
+        Scenario('register', 'POST', lambda rng: '/register', data=registration, login=False),
+        Scenario('new_blog', 'POST', lambda rng: '/blog/new',
+                 data=lambda rng: {'title': 'Benchmark', 'content': 'benchmark body ' * 50}),
+    ]
+
+
+class TestClientDriver:
+    """Requests through Flask's test client: measures the app without any network or server cost."""
+
+    mode = 'client'
+
+    def __init__(self, app):
+        self.app = app
+
+    def new_client(self, email):
+        client = self.app.test_client()
+        if email:
+            client.post('/login', data={'email': email, 'password': BENCH_PASSWORD})
+        return client
+
+    def request(self, client, method, path, data):
+        response = client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code, response.headers.get('X-Query-Count')
+
+
+class HttpSession:
+    """Minimal cookie-keeping HTTP client that does not follow redirects."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.cookies = SimpleCookie()
+
+    def request(self, method, path, data=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={morsel.value}' for key, morsel in self.cookies.items())
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        for header in response.headers.get_all('Set-Cookie') or ():
+            self.cookies.load(header)
+        conn.close()
+        return response.status, response.headers.get('X-Query-Count')
+
+
+class ServerDriver:
+    """Requests over real sockets against a threaded WSGI server running in this process."""
+
+    mode = 'server'
+
+    def __init__(self, app):
+        self.server = make_server('127.0.0.1', 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def new_client(self, email):
+        session = HttpSession('127.0.0.1', self.server.server_port)
+        if email:
+            session.request('POST', '/login', {'email': email, 'password': BENCH_PASSWORD})
+        return session
+
+    def request(self, client, method, path, data):
+        return client.request(method, path, data)
+
+    def close(self):
+        self.server.shutdown()
+
+
+class AsgiServerDriver(ServerDriver):
+    """Requests over real sockets against uvicorn serving ``asgi_app.AsyncApp`` in this process."""
+
+    mode = 'asgi'
+
+    def __init__(self, app):
+        import uvicorn
+        from asgi_app import AsyncApp  # Imported here: only this mode needs the async stack
+
+        self.socket = socket.socket()
+        self.socket.bind(('127.0.0.1', 0))
+        self.port = self.socket.getsockname()[1]
+        asgi = AsyncApp(app)
+        latency = app.config.get('BENCH_DB_LATENCY')
+        if latency:
+            from sqlalchemy.util import await_only
+
+            # Runs inside the async driver's greenlet, so the wait suspends only this request's task
+            event.listen(asgi.engine.sync_engine, 'before_cursor_execute',
+                         lambda *args: await_only(asyncio.sleep(latency)))
+        config = uvicorn.Config(asgi, log_level='warning', backlog=1024)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, kwargs={'sockets': [self.socket]}, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def new_client(self, email):
+        session = HttpSession('127.0.0.1', self.port)
+        if email:
+            session.request('POST', '/login', {'email': email, 'password': BENCH_PASSWORD})
+        return session
+
+    def close(self):
+        self.server.should_exit = True
+        self.thread.join()
+        self.socket.close()
+
+
+def simulate_db_latency(app, seconds):
+    """Delay every statement by `seconds`, like a database server across the network would.
+
+    The sync engines sleep, holding the request's thread as a blocking driver
+    does; ``AsgiServerDriver`` delays the async engine with an awaited sleep.
+    """
+    from extensions import db
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', lambda *args: time.sleep(seconds))
+    app.config['BENCH_DB_LATENCY'] = seconds
+
+
+class RegistrationStorm:
+    """Background threads posting /register continuously, to check other routes stay flat under bcrypt load."""
+
+    def __init__(self, driver, threads):
+        self.driver = driver
+        self.threads = threads
+        self._stop = threading.Event()
+        self._workers = []
+        self.statuses = []
+
+    def _run(self, index):
+        rng = random.Random(10_000 + index)
+        client = self.driver.new_client(None)
+        scenario = next(s for s in default_scenarios(1) if s.name == 'register')
+        while not self._stop.is_set():
+            status, _ = self.driver.request(client, 'POST', '/register', scenario.data(rng))
+            self.statuses.append(status)
+
+    def __enter__(self):
+        for index in range(self.threads):
+            worker = threading.Thread(target=self._run, args=(index,), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_scenario(driver, scenario, emails, requests, concurrency, seed_value=0):
+    """Fire `requests` requests across `concurrency` worker threads and summarise them."""
+    per_worker = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    # Log every client in before the clock starts so password hashing is not counted against the route
+    clients = [driver.new_client(emails[index % len(emails)] if scenario.login else None) for index in range(concurrency)]
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        client = clients[index]
+        samples = []
+        for _ in range(per_worker[index]):
+            data = scenario.data(rng) if scenario.data else None
+            started = time.perf_counter()
+            status, query_count = driver.request(client, scenario.method, scenario.path(rng), data)
+            samples.append((time.perf_counter() - started, status, query_count))
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [sample for chunk in pool.map(worker, range(concurrency)) for sample in chunk]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    query_counts = [int(sample[2]) for sample in samples if sample[2] is not None]
+    return {
+        'mode': driver.mode,
+        'route': scenario.name,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[1] >= 400),
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'queries_per_request': round(sum(query_counts) / len(query_counts), 2) if query_counts else None,
+    }
+
+
+def measure_peak_memory(driver, scenario, emails, requests):
+    """Peak Python heap (KiB) allocated while serving `requests` sequential requests."""
+    rng = random.Random(0)
+    client = driver.new_client(emails[0] if scenario.login else None)
+    tracemalloc.start()
+    try:
+        for _ in range(requests):
+            data = scenario.data(rng) if scenario.data else None
+            driver.request(client, scenario.method, scenario.path(rng), data)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
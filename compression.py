@@ -0,0 +1,143 @@
+"""gzip/brotli compression: build-time variants and on-the-fly responses.
+
+Build steps (``flask freeze``, ``flask assets build``) write ``file``,
+``file.gz`` and ``file.br`` side by side; at request time ``negotiate`` picks
+the best variant the client accepts.
+
+Everything else - pages rendered per request - goes through
+``ResponseCompression``, an ``after_request`` hook that encodes eligible
+responses in the best encoding the client accepts:
+
+* bodies shorter than COMPRESS_MIN_SIZE, non-text types, responses that
+  already carry a Content-Encoding (snapshots, fingerprinted assets), file
+  responses, partial content and ``Cache-Control: no-transform`` are left
+  alone;
+* buffered bodies, already in memory, are compressed in one go and keep a
+  Content-Length;
+* streamed responses are compressed lazily, chunk by chunk as the server
+  sends them, flushing after each chunk so streamed pages still arrive
+  progressively;
+* strong ETags become weak, since the encoded bytes differ from the
+  identity representation the tag was computed for.
+"""
+import gzip
+import os
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are produced
+    brotli = None
+
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # Content-Encoding and file suffix, preferred first
+
+
+def compressors():
+    """Maximum-effort compressors for build-time use, keyed by Content-Encoding."""
+    available = {'gzip': lambda data: gzip.compress(data, 9, mtime=0)}  # mtime=0 keeps output reproducible
+    if brotli is not None:
+        available['br'] = lambda data: brotli.compress(data, quality=11)
+    return available
+
+
+def negotiate(accept_encodings, available):
+    """Return the (encoding, suffix) to serve, or (None, '') for the identity representation."""
+    for name, suffix in ENCODINGS:
+        if name in available and accept_encodings[name]:
+            return name, suffix
+    return None, ''
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_variants(path, data, available, only_if_smaller=False):
+    """Write `data` to `path` plus one compressed sibling per compressor; return the encodings written."""
+    write_atomic(path, data)
+    written = []
+    for name, suffix in ENCODINGS:
+        if name not in available:
+            continue
+        compressed = available[name](data)
+        if only_if_smaller and len(compressed) >= len(data):
+            continue  # Already-compressed formats (images, fonts) gain nothing
+        write_atomic(path + suffix, compressed)
+        written.append(name)
+    return sorted(written)
+
+
+def _streaming_encoder(encoding, gzip_level, brotli_quality):
+    """Return (compress, flush, finish) callables for one response body."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=brotli_quality)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+class ResponseCompression:
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        self.min_size = config.get('COMPRESS_MIN_SIZE', 500)
+        self.gzip_level = config.get('COMPRESS_LEVEL', 6)
+        self.brotli_quality = config.get('COMPRESS_BR_LEVEL', 4)
+        self.mimetypes = frozenset(config.get('COMPRESS_MIMETYPES', ('text/html',)))
+        self.available = ('gzip', 'br') if brotli is not None else ('gzip',)
+        app.extensions['compression'] = self
+        if config.get('COMPRESS_ENABLED', True):
+            app.after_request(self.compress)
+
+    def compress(self, response):
+        if response.mimetype not in self.mimetypes:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (response.content_encoding or response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'no-transform' in response.cache_control):
+            return response
+        if response.is_sequence:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+        encoding, _ = negotiate(request.accept_encodings, self.available)
+        if encoding is None:
+            return response
+
+        compress, flush, finish = _streaming_encoder(encoding, self.gzip_level, self.brotli_quality)
+        if response.is_sequence:
+            response.set_data(compress(data) + finish())
+        else:
+            response.response = self._stream(response.response, compress, flush, finish)
+            response.headers.pop('Content-Length', None)
+        response.content_encoding = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    @staticmethod
+    def _stream(chunks, compress, flush, finish):
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                data = compress(chunk) + flush()
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
@@ -0,0 +1,92 @@
+"""Conditional GET support (ETag / Last-Modified) for HTML views.
+
+Validators are computed from cheap inputs - a row's ``updated_at``, a per-user
+counter, the template sources - so a matching ``If-None-Match`` or
+``If-Modified-Since`` is answered with 304 before the view runs its full query
+and render.
+"""
+import hashlib
+import os
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+_fingerprints = {}
+
+
+def template_fingerprint(app=None):
+    """Hash of every template source, so a deploy that changes markup changes every ETag."""
+    app = app or current_app
+    folder = os.path.join(app.root_path, app.template_folder)
+    if folder in _fingerprints and not app.debug:
+        return _fingerprints[folder]
+    digest = hashlib.sha1()
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, folder).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    _fingerprints[folder] = digest.hexdigest()[:16]
+    return _fingerprints[folder]
+
+
+def make_etag(*parts):
+    """Build an ETag from the inputs a page depends on, plus templates, assets and login state."""
+    # The navbar differs for logged-in users; read the session key rather than loading the user
+    assets = current_app.extensions.get('assets')  # Rebuilt assets change the URLs pages embed
+    parts = parts + (template_fingerprint(), assets.version if assets else '', '_user_id' in session)
+    return hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def conditional_allowed():
+    # Pages carrying pending flash messages are one-off renders and must never be revalidated
+    return request.method in ('GET', 'HEAD') and not session.get('_flashes')
+
+
+def set_validators(response, etag, last_modified=None):
+    response.set_etag(etag, weak=response.content_encoding is not None)  # Encoded bodies are one of several representations
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'  # Always revalidate, never share between users
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the request's validators match, otherwise None."""
+    if not conditional_allowed():
+        return None
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since and uses weak comparison
+        matched = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since:
+        # HTTP dates have one-second resolution and our timestamps are naive UTC
+        matched = last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    else:
+        matched = False
+    if not matched:
+        return None
+    return set_validators(make_response('', 304), etag, last_modified)
+
+
+def conditional(compute_validators):
+    """Decorate a view with conditional GET handling.
+
+    `compute_validators(**view_args)` must return ``(etag, last_modified)``
+    (last_modified may be None) without doing the view's expensive work.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not conditional_allowed():
+                return view(*args, **kwargs)
+            etag, last_modified = compute_validators(**kwargs)
+            response = not_modified(etag, last_modified)
+            if response is not None:
+                return response
+            return set_validators(make_response(view(*args, **kwargs)), etag, last_modified)
+        return wrapper
+    return decorator
@@ -1,5 +1,24 @@
 import os
 
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() == 'true'
+
+def env_list(name, default=''):
+    return [item.strip() for item in os.environ.get(name, default).split(',') if item.strip()]
+
+def engine_options(uri):
+    """SQLAlchemy engine options for the given database URI, driven by environment variables."""
+    if uri.startswith('sqlite'):
+        # SQLite has no server-side connection limit; concurrency is tuned through pragmas instead (see database.py)
+        return {}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),  # Persistent connections per worker
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),  # Extra connections allowed under burst load
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),  # Seconds to wait for a free connection
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # Reconnect before servers drop idle connections
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),  # Detect dead connections before handing them out
+    }
+
 class Config:
     # General Configuration
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'  # Enable debug based on environment variable
@@ -8,10 +27,142 @@ class Config:
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URI', 'sqlite:///blog.db')  # Database URI with default SQLite
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Disable SQLAlchemy event notifications (performance boost)
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)  # Connection pool settings for server databases
+
+    # Read Replicas (comma-separated URIs); SELECTs from GET requests are spread across them
+    DATABASE_REPLICA_URIS = env_list('DATABASE_REPLICA_URIS')
+    SQLALCHEMY_BINDS = {
+        f'replica_{index}': dict(url=uri, **engine_options(uri)) for index, uri in enumerate(DATABASE_REPLICA_URIS)
+    }
+    DB_READ_YOUR_WRITES_SECONDS = int(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', 5))  # Primary-only window after a write
+
+    # ASGI Mode (asgi.py; see asgi_app.py)
+    # Default: the primary's URI on its asyncio driver (aiosqlite, asyncpg)
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 32))  # Requests handed to the WSGI app at once
+
+    # SQLite Tuning (applied to every new SQLite connection)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')  # WAL lets readers run alongside a writer
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # Safe with WAL, far fewer fsyncs than FULL
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # Milliseconds to wait on a lock instead of failing
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))  # Bytes of the database file to memory-map
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # Page cache; negative values are KiB
+
+    # Pagination Configuration
+    BLOG_PAGE_SIZE = int(os.environ.get('BLOG_PAGE_SIZE', 20))  # Posts per dashboard, tag and archive page
+    BLOG_MAX_PAGE_SIZE = int(os.environ.get('BLOG_MAX_PAGE_SIZE', 100))  # Upper bound for ?per_page=
+    TAG_LIST_SIZE = int(os.environ.get('TAG_LIST_SIZE', 200))  # Most-used tags shown on /tags
+
+    # Search Configuration
+    SEARCH_PAGE_SIZE = int(os.environ.get('SEARCH_PAGE_SIZE', 20))  # Results per search page
+    SEARCH_MAX_PAGES = int(os.environ.get('SEARCH_MAX_PAGES', 50))  # Deepest result page served
+
+    # Page Cache Configuration
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory')  # memory, sqlite (shared by workers) or none
+    PAGE_CACHE_MAX_ENTRIES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 1024))  # Entries kept before LRU eviction
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))  # Seconds before an entry expires
+    PAGE_CACHE_PATH = os.environ.get('PAGE_CACHE_PATH', 'page_cache.db')  # SQLite backend file, relative to instance/
+
+    # Templates
+    # Stat template files on every render; unset (None) follows debug mode, as in Flask
+    TEMPLATES_AUTO_RELOAD = env_bool('TEMPLATES_AUTO_RELOAD', False) if 'TEMPLATES_AUTO_RELOAD' in os.environ else None
+    # filesystem (shared by the host's workers) or none
+    TEMPLATE_BYTECODE_CACHE = os.environ.get('TEMPLATE_BYTECODE_CACHE', 'filesystem')
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', 'jinja_cache')  # Bytecode directory, relative to instance/
+    TEMPLATE_PRECOMPILE = env_bool('TEMPLATE_PRECOMPILE', True)  # Compile every template at start-up, not on first use
+    TEMPLATE_STREAMING = env_bool('TEMPLATE_STREAMING', True)  # Stream long pages (dashboard, posts) as they render
+    STREAM_BUFFER_SIZE = int(os.environ.get('STREAM_BUFFER_SIZE', 8192))  # Bytes of rendered HTML per streamed chunk
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 50))  # Rows fetched per query round-trip while streaming
+
+    # Rate Limiting (token buckets per endpoint; see ratelimit.py for the rule syntax)
+    RATELIMIT_ENABLED = env_bool('RATELIMIT_ENABLED', True)
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'memory')  # memory, sqlite (shared by workers) or none
+    RATELIMIT_PATH = os.environ.get('RATELIMIT_PATH', 'ratelimit.db')  # SQLite backend file, relative to instance/
+    RATELIMIT_MAX_KEYS = int(os.environ.get('RATELIMIT_MAX_KEYS', 100000))  # Buckets kept by the memory backend
+    RATELIMIT_METHODS = [method.upper() for method in env_list('RATELIMIT_METHODS', 'POST')]  # Methods that take tokens
+    # Reverse proxies (addresses or CIDR networks, comma-separated) whose X-Forwarded-For names the client
+    RATELIMIT_TRUSTED_PROXIES = env_list('RATELIMIT_TRUSTED_PROXIES')
+    RATELIMIT_RULES = {
+        'main.register': os.environ.get('RATELIMIT_REGISTER', 'ip:5/minute, ip:20/hour'),
+        'security.login': os.environ.get('RATELIMIT_LOGIN', 'ip:10/minute, ip:100/hour'),  # Each attempt costs a bcrypt hash
+        'main.new_blog': os.environ.get('RATELIMIT_NEW_BLOG', 'user:10/minute, user:100/day'),
+        'main.subscribe': os.environ.get('RATELIMIT_SUBSCRIBE', 'ip:5/minute'),
+        'main.unsubscribe': os.environ.get('RATELIMIT_UNSUBSCRIBE', 'ip:5/minute'),  # Both send mail
+    }
+
+    # Response Compression (dynamic responses; snapshots and assets are precompressed)
+    COMPRESS_ENABLED = env_bool('COMPRESS_ENABLED', True)  # Disable when a proxy in front already compresses
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))  # Smaller bodies are sent as they are
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip level, 1 (fastest) to 9
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))  # Brotli quality, 0 to 11; 4 suits per-request work
+    COMPRESS_MIMETYPES = env_list(
+        'COMPRESS_MIMETYPES',
+        'text/html,text/css,text/plain,text/xml,text/javascript,application/javascript,application/json,'
+        'application/xml,application/atom+xml,application/rss+xml,image/svg+xml',
+    )
+
+    # Static Assets (flask assets build)
+    ASSETS_BUILD_DIR = os.environ.get('ASSETS_BUILD_DIR', 'build/assets')  # Fingerprinted output, relative to the app root
+    ASSETS_MAX_AGE = int(os.environ.get('ASSETS_MAX_AGE', 31536000))  # Cache lifetime of fingerprinted files (immutable)
+
+    # Static Snapshots (flask freeze)
+    FREEZE_DIR = os.environ.get('FREEZE_DIR', 'snapshots')  # Output directory, relative to instance/
+    FREEZE_SERVE = env_bool('FREEZE_SERVE', True)  # Answer anonymous requests from snapshots when present
+    FREEZE_MAX_AGE = int(os.environ.get('FREEZE_MAX_AGE', 86400))  # Cache-Control max-age for served snapshots
+
+    # Sitemap and Feeds (flask feeds build; rebuilt by a job when a post is published)
+    FEEDS_DIR = os.environ.get('FEEDS_DIR', 'feeds')  # Output directory, relative to instance/
+    # Scheme and host for absolute URLs, e.g. https://blog.example.com; unset falls back to SERVER_NAME
+    FEEDS_BASE_URL = os.environ.get('FEEDS_BASE_URL')
+    FEEDS_TITLE = os.environ.get('FEEDS_TITLE', 'My Blog')
+    FEEDS_SIZE = int(os.environ.get('FEEDS_SIZE', 50))  # Newest posts in feed.atom and feed.json
+    FEEDS_MAX_AGE = int(os.environ.get('FEEDS_MAX_AGE', 3600))  # Cache-Control max-age for sitemap and feed responses
+
+    # Background Jobs
+    # thread (workers in each app process), external (flask jobs work) or inline
+    JOBS_MODE = os.environ.get('JOBS_MODE', 'thread')
+    JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 2))  # Worker threads per app process in thread mode
+    JOBS_MAX_ATTEMPTS = int(os.environ.get('JOBS_MAX_ATTEMPTS', 5))  # Tries before a job is marked failed
+    JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 2.0))  # Seconds an idle worker waits before polling
+    JOBS_LOCK_TIMEOUT = int(os.environ.get('JOBS_LOCK_TIMEOUT', 300))  # Seconds before a running job is presumed dead
+
+    # Mail Configuration (notifications are logged when MAIL_SERVER is unset)
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = env_bool('MAIL_USE_TLS', True)
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@example.com')
+    SUBSCRIBE_CONFIRM_MAX_AGE = int(os.environ.get('SUBSCRIBE_CONFIRM_MAX_AGE', 3 * 24 * 3600))  # Seconds a link stays valid
 
     # Flask-Security Configuration
     SECURITY_PASSWORD_SALT = os.environ.get('SECURITY_PASSWORD_SALT', 'your_default_password_salt')  # Password salt
     SECURITY_PASSWORD_HASH = 'bcrypt'  # Secure password hashing method
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))  # Work factor; hashes below it are upgraded on login
+    SECURITY_PASSWORD_HASH_PASSLIB_OPTIONS = {
+        'bcrypt__default_rounds': BCRYPT_ROUNDS,
+        'bcrypt__min_rounds': BCRYPT_ROUNDS,  # Marks weaker hashes as needing an update
+    }
+    # Hashing processes per app worker; 0 hashes inline
+    PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', 2))
+    PASSWORD_POOL_QUEUE_DEPTH = int(os.environ.get('PASSWORD_POOL_QUEUE_DEPTH', 16))  # Hash requests allowed to wait
+    PASSWORD_POOL_WAIT = float(os.environ.get('PASSWORD_POOL_WAIT', 0.5))  # Seconds to wait for a slot before answering 503
+    SECURITY_JOIN_USER_ROLES = True  # Load roles in the same query as the user
+    # Seconds a logged-in user is cached per process; 0 disables
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+
+    # Debugging
+    QUERY_COUNT_HEADER = env_bool('QUERY_COUNT_HEADER', False)  # Add X-Query-Count outside debug mode too
+
+    # Instrumentation (opt-in)
+    INSTRUMENTATION_ENABLED = env_bool('INSTRUMENTATION_ENABLED', False)  # Phase timers, /metrics and Server-Timing
+    # Addresses or CIDR networks allowed to scrape /metrics (comma-separated); everyone else gets a 404
+    METRICS_ALLOWED_IPS = env_list('METRICS_ALLOWED_IPS', '127.0.0.1,::1')
+    SERVER_TIMING_HEADER = env_bool('SERVER_TIMING_HEADER', True)  # Emit Server-Timing when instrumentation is on
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # Fraction of requests run under cProfile
+    PROFILE_KEEP_SLOWEST = int(os.environ.get('PROFILE_KEEP_SLOWEST', 10))  # Dumps kept for the slowest N sampled requests
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')  # Dump directory, relative to instance/
 
     # Flask-WTF Configuration
     WTF_CSRF_ENABLED = True  # Enable CSRF protection for forms
@@ -0,0 +1,127 @@
+"""Connection-level tuning and read-replica routing for the SQLAlchemy engines."""
+import random
+import sqlite3
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND_PREFIX = 'replica_'  # SQLALCHEMY_BINDS keys starting with this are read replicas
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg', 'mysql': 'aiomysql'}  # Default asyncio driver per dialect
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Config key -> pragma name; values are read from app.config when the hook is installed
+SQLITE_PRAGMAS = {
+    'SQLITE_JOURNAL_MODE': 'journal_mode',
+    'SQLITE_SYNCHRONOUS': 'synchronous',
+    'SQLITE_BUSY_TIMEOUT': 'busy_timeout',
+    'SQLITE_MMAP_SIZE': 'mmap_size',
+    'SQLITE_CACHE_SIZE': 'cache_size',
+}
+
+
+def sqlite_pragma_statements(config):
+    return [f'PRAGMA {pragma}={config[key]}' for key, pragma in SQLITE_PRAGMAS.items() if config.get(key) is not None]
+
+
+def tune_engines(app, db):
+    """Install a connect-time hook that applies the configured pragmas to every SQLite engine."""
+    statements = sqlite_pragma_statements(app.config)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name != 'sqlite':
+            continue  # Pool options for server databases come from SQLALCHEMY_ENGINE_OPTIONS
+
+        @event.listens_for(engine, 'connect')
+        def _apply_pragmas(dbapi_connection, connection_record):
+            if not isinstance(dbapi_connection, sqlite3.Connection):
+                return
+            cursor = dbapi_connection.cursor()
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.close()
+
+
+def create_async_engine_for(app, db):
+    """An asyncio engine on the primary database, tuned like the sync ones (see ``asgi_app.py``).
+
+    ASYNC_DATABASE_URI overrides the URL; by default it is the primary's URL -
+    with Flask-SQLAlchemy's instance-folder resolution for SQLite already
+    applied - on the dialect's asyncio driver.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine  # Only the ASGI mode needs greenlet and the async drivers
+
+    with app.app_context():
+        url = db.engine.url
+    if app.config.get('ASYNC_DATABASE_URI'):
+        url = app.config['ASYNC_DATABASE_URI']
+    elif url.get_backend_name() in ASYNC_DRIVERS:
+        url = url.set(drivername=f'{url.get_backend_name()}+{ASYNC_DRIVERS[url.get_backend_name()]}')
+    else:
+        raise RuntimeError(f'No asyncio driver known for {url.get_backend_name()!r}; set ASYNC_DATABASE_URI')
+    engine = create_async_engine(url, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if engine.dialect.name == 'sqlite':
+        statements = sqlite_pragma_statements(app.config)
+
+        @event.listens_for(engine.sync_engine, 'connect')
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()  # The driver's adapted connection, usable synchronously here
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.close()
+    return engine
+
+
+def _reads_may_use_replica():
+    if not has_request_context() or request.method not in SAFE_METHODS:
+        return False
+    if g.get('db_use_primary'):
+        return False
+    # Read-your-writes: a client that just wrote keeps reading from the primary for a short while
+    return http_session.get('_db_primary_until', 0) < time.time()
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs from safe requests to a replica and everything else to the primary.
+
+    Flushes, DML statements, anything that is not a known SELECT (textual SQL,
+    ``session.connection()``) and any request that is not GET/HEAD/OPTIONS
+    always use the primary, as do requests marked with @use_primary and
+    clients inside their read-your-writes window.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and getattr(clause, 'is_select', False) and _reads_may_use_replica():
+            replicas = [engine for key, engine in self._db.engines.items()
+                        if key and key.startswith(REPLICA_BIND_PREFIX)]
+            if replicas:
+                return random.choice(replicas)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_primary(view):
+    """Route every query made by this view to the primary, e.g. for pages that must show fresh data."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_use_primary = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_replica_routing(app, db):
+    """Pin clients to the primary for DB_READ_YOUR_WRITES_SECONDS after any request that wrote."""
+    stickiness = app.config.get('DB_READ_YOUR_WRITES_SECONDS', 5)
+
+    @event.listens_for(db.session, 'after_flush')
+    def _remember_write(session, flush_context):
+        if has_request_context():
+            g.db_wrote = True
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get('db_wrote') and app.config.get('SQLALCHEMY_BINDS'):
+            http_session['_db_primary_until'] = time.time() + stickiness
+        return response
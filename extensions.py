@@ -0,0 +1,32 @@
+"""Extension instances shared by the app factory, models and views.
+
+They are created unbound so importing this module is cheap; ``create_app``
+binds each of them to an application with ``init_app``.
+"""
+from flask_migrate import Migrate
+from flask_security import Security
+from flask_sqlalchemy import SQLAlchemy
+
+from assets import AssetPipeline
+from compression import ResponseCompression
+from database import RoutingSession
+from feeds import FeedStore
+from freeze import SnapshotStore
+from instrumentation import Instrumentation
+from jobs import JobQueue
+from page_cache import PageCache
+from ratelimit import RateLimiter
+from template_cache import TemplateCache
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # Replica-aware sessions
+migrate = Migrate(render_as_batch=True)  # Batch mode for SQLite ALTERs
+security = Security()
+page_cache = PageCache()  # Rendered-page cache for read-heavy views
+snapshots = SnapshotStore()  # Precompressed snapshots written by `flask freeze`
+job_queue = JobQueue()  # Background jobs for post-publication fan-out
+instrumentation = Instrumentation()  # Opt-in timers, /metrics and Server-Timing
+template_cache = TemplateCache()  # Bytecode cache and start-up precompilation
+assets = AssetPipeline()  # Fingerprinted static files and the asset_url() template helper
+response_compression = ResponseCompression()  # gzip/brotli for dynamic responses, streamed when large
+rate_limiter = RateLimiter()  # Token buckets for register, login and posting
+feeds = FeedStore()  # sitemap.xml, Atom and JSON feeds, rebuilt when posts are published
@@ -0,0 +1,278 @@
+"""Machine-readable sitemap and feeds, generated ahead of requests.
+
+``FeedStore.build`` writes, under ``instance/<FEEDS_DIR>``:
+
+* ``sitemap.xml`` - a ``<urlset>`` of the public pages. Posts are for members
+  only (``/blog/<id>`` requires a login), so they are not listed for crawlers;
+* ``feed.atom`` and ``feed.json`` (Atom and JSON Feed 1.1) with the newest
+  FEEDS_SIZE posts, read newest-first through the ``(date_posted, id)`` index.
+  Like the posts they link to, the feeds are only served to logged-in users.
+
+Each file gets gzip/brotli siblings. Builds are incremental: every file is
+fingerprinted from its inputs (the page list, or the ids and versions of the
+newest posts) plus its template and base URL, and only files whose
+fingerprint changed are rendered again. A ``post_published`` job runs the
+build; ``flask feeds build`` does the same from the command line.
+
+Absolute URLs use FEEDS_BASE_URL, else ``PREFERRED_URL_SCHEME://SERVER_NAME``.
+The host a request names is never used: it is whatever the client sent, and
+the files are stored and served to everyone. A build with neither setting is
+refused rather than writing ``localhost`` links.
+
+Entry summaries are plain text taken from the rendered post, so Markdown
+syntax never shows up in feed readers.
+
+Requests only read the files: each is served in the best encoding the client
+accepts with an ETag and Last-Modified, and conditional GETs are answered
+with 304. If nothing has been built yet the first request builds it, or gets
+a 404 while no base URL is configured.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+import click
+from flask import Response, current_app, render_template, request, url_for
+from flask.cli import AppGroup
+from flask_security import login_required
+from werkzeug.exceptions import NotFound
+
+from compression import ENCODINGS, compressors, negotiate, write_atomic, write_variants
+from rendering import RENDERER_VERSION, plain_text, render_markdown
+
+MANIFEST = 'manifest.json'
+MIMETYPES = {'.xml': 'application/xml', '.atom': 'application/atom+xml', '.json': 'application/feed+json'}
+EPOCH = datetime(1970, 1, 1)  # `updated` of an empty feed, so its output stays deterministic
+SUMMARY_LENGTH = 200  # Characters of plain text in each entry's summary
+FORMAT_VERSION = 2  # Part of every fingerprint: bump when the output changes but its inputs and templates don't
+
+
+class FeedStore:
+
+    def __init__(self, app=None, db=None, Blog=None):
+        self.urls = []  # Public pages listed in the sitemap besides the posts
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._build_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db, Blog)
+
+    def init_app(self, app, db, Blog):
+        self.db, self.Blog = db, Blog
+        config = app.config
+        self.directory = os.path.join(app.instance_path, config.get('FEEDS_DIR', 'feeds'))
+        self.max_age = config.get('FEEDS_MAX_AGE', 3600)
+        self.feed_size = config.get('FEEDS_SIZE', 50)
+        self.base_url = config.get('FEEDS_BASE_URL')
+        self.title = config.get('FEEDS_TITLE', 'My Blog')
+        app.extensions['feeds'] = self
+        app.add_url_rule('/sitemap.xml', 'sitemap_xml', lambda: self.send('sitemap.xml'))
+        app.add_url_rule('/feed.atom', 'feed_atom', login_required(lambda: self.send('feed.atom', private=True)))
+        app.add_url_rule('/feed.json', 'feed_json', login_required(lambda: self.send('feed.json', private=True)))
+
+    def register_urls(self, paths):
+        """Declare public pages (URL paths) to list in the sitemap."""
+        self.urls.extend(path for path in paths if path not in self.urls)
+
+    # Serving
+
+    def manifest(self):
+        """The current manifest, re-read whenever a build has replaced it."""
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        if mtime != self._manifest_mtime:
+            with open(path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def send(self, name, private=False):
+        manifest = self.manifest()
+        if not manifest:  # Nothing built yet: build once, then serve the files
+            if self.resolve_base_url() is None:
+                current_app.logger.warning('Cannot build %s: set FEEDS_BASE_URL or SERVER_NAME', name)
+                raise NotFound()
+            manifest = self.build().manifest
+        entry = manifest.get(name)
+        if entry is None:
+            raise NotFound()
+        encoding, suffix = negotiate(request.accept_encodings, entry['encodings'])
+        try:
+            with open(os.path.join(self.directory, name + suffix), 'rb') as f:
+                body = f.read()
+        except OSError:
+            raise NotFound()  # Pruned by a concurrent build
+        response = Response(body, mimetype=MIMETYPES[os.path.splitext(name)[1]])
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(entry['etag'], weak=encoding is not None)  # One representation per encoding
+        if entry['modified']:
+            response.last_modified = datetime.fromisoformat(entry['modified']).replace(tzinfo=timezone.utc)
+        response.headers['Cache-Control'] = f"{'private' if private else 'public'}, max-age={self.max_age}"
+        return response.make_conditional(request)
+
+    # Building
+
+    def resolve_base_url(self):
+        """Configured scheme and host for absolute URLs, or None when neither setting is present."""
+        config = current_app.config
+        if self.base_url:
+            return self.base_url
+        if config.get('SERVER_NAME'):
+            return f"{config.get('PREFERRED_URL_SCHEME', 'http')}://{config['SERVER_NAME']}"
+        return None
+
+    def build(self, force=False):
+        """Regenerate every file whose inputs changed; return the finished FeedBuilder."""
+        base_url = self.resolve_base_url()
+        if base_url is None:
+            raise RuntimeError('Feeds need absolute URLs: set FEEDS_BASE_URL or SERVER_NAME')
+        with self._build_lock, current_app.test_request_context(base_url=base_url):
+            builder = FeedBuilder(self, base_url, force)
+            builder.run()
+        return builder
+
+
+class FeedBuilder:
+    """One incremental build of the feeds directory."""
+
+    def __init__(self, store, base_url, force=False):
+        self.store = store
+        self.base_url = base_url
+        self.db, self.Blog = store.db, store.Blog
+        self.compressors = compressors()
+        self.previous = {} if force else store.manifest()
+        self.manifest = {}
+        self.counts = {'written': 0, 'unchanged': 0, 'removed': 0}
+
+    def run(self):
+        self.sitemap()
+        self.feeds()
+        self.finish()
+
+    def write(self, name, template, inputs, modified, render):
+        """Render and write `name` unless its template and `inputs` are unchanged since the last build."""
+        env = current_app.jinja_env
+        source = env.loader.get_source(env, template)[0] if template else ''
+        fingerprint = hashlib.sha1(f'{FORMAT_VERSION}|{source}|{self.base_url}|{inputs}'.encode()).hexdigest()
+        previous = self.previous.get(name)
+        path = os.path.join(self.store.directory, name)
+        if previous and previous['fingerprint'] == fingerprint and os.path.exists(path):
+            self.manifest[name] = previous
+            self.counts['unchanged'] += 1
+            return
+        data = render().encode()
+        etag = hashlib.sha1(data).hexdigest()[:20]
+        encodings = sorted(self.compressors)
+        if previous and previous['etag'] == etag and previous['encodings'] == encodings and os.path.exists(path):
+            self.counts['unchanged'] += 1  # Inputs moved but the output did not
+        else:
+            write_variants(path, data, self.compressors)
+            self.counts['written'] += 1
+        self.manifest[name] = {'fingerprint': fingerprint, 'etag': etag, 'encodings': encodings,
+                               'modified': modified.isoformat() if modified else None}
+
+    # sitemap.xml
+
+    def sitemap(self):
+        pages = [(url_for('main.index', _external=True).rstrip('/') + path, None) for path in self.store.urls]
+        self.write('sitemap.xml', 'feeds/urlset.xml', json.dumps(self.store.urls), None,
+                   lambda: render_template('feeds/urlset.xml', urls=pages))
+
+    # feed.atom and feed.json
+
+    def feeds(self):
+        Blog = self.Blog
+        posts = self.db.session.execute(
+            self.db.select(Blog.id, Blog.title, Blog.content, Blog.content_html, Blog.content_html_version,
+                           Blog.date_posted, Blog.updated_at)
+            .order_by(Blog.date_posted.desc(), Blog.id.desc())
+            .limit(self.store.feed_size)
+        ).all()
+        inputs = json.dumps([self.store.title, RENDERER_VERSION] + [(post.id, str(post.updated_at)) for post in posts])
+        updated = max((post.updated_at for post in posts), default=None)
+        context = {
+            'title': self.store.title,
+            'posts': [{
+                'title': post.title,
+                'summary': self.summary(post),
+                'date_posted': post.date_posted,
+                'updated_at': post.updated_at,
+                'url': url_for('main.blog', blog_id=post.id, _external=True),
+            } for post in posts],
+            'updated': updated or EPOCH,
+            'home_url': url_for('main.index', _external=True),
+        }
+        self.write('feed.atom', 'feeds/atom.xml', inputs, updated,
+                   lambda: render_template('feeds/atom.xml', **context))
+        self.write('feed.json', None, inputs, updated, lambda: self.json_feed(**context))
+
+    @staticmethod
+    def summary(post):
+        # From the rendered HTML, so the Markdown syntax is gone; stale HTML is rendered afresh, not stored
+        html = post.content_html if post.content_html_version == RENDERER_VERSION else render_markdown(post.content)
+        return plain_text(html, SUMMARY_LENGTH)
+
+    @staticmethod
+    def json_feed(title, posts, updated, home_url):
+        return json.dumps({
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': title,
+            'home_page_url': home_url,
+            'feed_url': url_for('feed_json', _external=True),
+            'items': [{
+                'id': post['url'],
+                'url': post['url'],
+                'title': post['title'],
+                'content_text': post['summary'],
+                'date_published': post['date_posted'].isoformat() + 'Z',
+                'date_modified': post['updated_at'].isoformat() + 'Z',
+            } for post in posts],
+        }, indent=1)
+
+    def finish(self):
+        for name in self.previous:
+            if name not in self.manifest:  # Left over from an older layout, such as the per-post sitemap shards
+                for suffix in ('',) + tuple(suffix for _, suffix in ENCODINGS):
+                    try:
+                        os.remove(os.path.join(self.store.directory, name + suffix))
+                    except OSError:
+                        pass
+                self.counts['removed'] += 1
+        write_atomic(os.path.join(self.store.directory, MANIFEST),
+                     json.dumps(self.manifest, indent=1, sort_keys=True).encode())
+
+
+def register_handlers(queue, store):
+    """Rebuild the sitemap and feeds in the background whenever a post is published."""
+
+    @queue.handler('regenerate_feeds')
+    def regenerate_feeds(blog_id, base_url=None):  # base_url: ignored; jobs queued by older releases still send it
+        if store.resolve_base_url() is None:
+            current_app.logger.warning('Feeds not rebuilt for post %s: set FEEDS_BASE_URL or SERVER_NAME', blog_id)
+            return
+        store.build()  # Incremental: only the feeds change
+
+    queue.subscribe('post_published', 'regenerate_feeds')
+
+
+feeds_cli = AppGroup('feeds', help='Sitemap and feed generation.')
+
+
+@feeds_cli.command('build')
+@click.option('--force', is_flag=True, help='Ignore the previous manifest and rewrite every file.')
+def build_command(force):
+    """Regenerate sitemap.xml, feed.atom and feed.json where their inputs changed."""
+    store = current_app.extensions['feeds']
+    try:
+        counts = store.build(force=force).counts
+    except RuntimeError as error:
+        raise click.ClickException(str(error))
+    click.echo(f"Feeds in {store.directory}: {counts['written']} written, {counts['unchanged']} unchanged, "
+               f"{counts['removed']} removed.")
@@ -0,0 +1,222 @@
+"""Pre-rendered, precompressed snapshots of public pages.
+
+``flask freeze`` renders every page registered with ``SnapshotStore.register``
+(the static pages, the HTML sitemap), the error pages and, with ``--posts``,
+every post, and writes each one as ``.html``, ``.html.gz`` and ``.html.br``
+under ``instance/<FREEZE_DIR>`` together with a ``manifest.json``.
+
+Builds are incremental. A page's inputs are its template sources (including
+everything it extends or includes), its context, the asset manifest version
+and, for posts, ``rendering.post_version`` (``updated_at`` plus the Markdown
+renderer version); a page is only re-rendered when they changed, and only
+recompressed when the rendered HTML actually differs.
+
+While serving, anonymous GETs of a frozen public page are answered straight
+from the snapshot with long-lived public cache headers and the encoding the
+client accepts. Logged-in users, who see a different navbar, still get the
+live page. Post snapshots are used by the post view as a precompressed cache
+tier, keyed on the same ``post_version`` as the page cache.
+"""
+import hashlib
+import json
+import os
+from functools import wraps
+
+import click
+from flask import Response, current_app, g, render_template, request, session
+from flask.cli import with_appcontext
+from jinja2 import meta
+from sqlalchemy.orm import selectinload
+
+from compression import ENCODINGS, compressors, negotiate, write_atomic, write_variants
+from conditional import conditional_allowed
+
+MANIFEST = 'manifest.json'
+
+
+def _file_for(path):
+    """Relative output file for a URL path: /about -> about/index.html, / -> index.html."""
+    return os.path.join(path.strip('/'), 'index.html') if path.strip('/') else 'index.html'
+
+
+class SnapshotStore:
+
+    def __init__(self, app=None):
+        self.pages = {}  # path -> (template, context)
+        self.error_pages = {}  # status code -> (template, context)
+        self._manifest = {}
+        self._manifest_mtime = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = os.path.join(app.instance_path, app.config.get('FREEZE_DIR', 'snapshots'))
+        self.enabled = app.config.get('FREEZE_SERVE', True)
+        self.max_age = app.config.get('FREEZE_MAX_AGE', 86400)
+        app.extensions['snapshots'] = self
+
+    # Registration
+
+    def register(self, path, template, **context):
+        """Declare a public page that `flask freeze` should snapshot."""
+        self.pages[path] = (template, context)
+
+    def register_error(self, code, template, **context):
+        self.error_pages[code] = (template, context)
+
+    # Serving
+
+    def manifest(self):
+        """The current manifest, re-read whenever a build has replaced it."""
+        path = os.path.join(self.directory, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        if mtime != self._manifest_mtime:
+            with open(path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def response(self, key, version=None):
+        """The snapshot stored under `key` as a response, or None if missing or not at `version`."""
+        if not self.enabled:
+            return None
+        entry = self.manifest().get(key)
+        if entry is None or entry.get('version') != version:
+            return None
+        encoding, suffix = negotiate(request.accept_encodings, entry['encodings'])
+        try:
+            with open(os.path.join(self.directory, entry['file'] + suffix), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None  # Removed behind our back; fall back to rendering
+        response = Response(body, status=entry['status'], mimetype='text/html')
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def public(self, view):
+        """Serve `view`'s frozen snapshot to anonymous visitors, with long-lived public caching."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if '_user_id' not in session and conditional_allowed():
+                response = self.response(request.path)
+                if response is not None:
+                    return self._cache_publicly(response, self.manifest()[request.path]['etag'])
+            return view(*args, **kwargs)
+        return wrapper
+
+    def error_response(self, code):
+        if '_user_id' in session or not conditional_allowed():
+            return None
+        return self.response(f'error:{code}')
+
+    def _cache_publicly(self, response, etag):
+        # One representation per encoding, so the validator is weak
+        response.set_etag(etag, weak=response.content_encoding is not None)
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
+
+
+class Freezer:
+    """One incremental build of the snapshot directory."""
+
+    def __init__(self, app, store, force=False):
+        self.app = app
+        self.store = store
+        self.compressors = compressors()
+        self.previous = {} if force else store.manifest()
+        self.manifest = {}
+        self.template_hashes = {}
+        assets = app.extensions.get('assets')
+        self.asset_version = assets.version if assets else ''  # Pages embed fingerprinted asset URLs
+        self.counts = {'rendered': 0, 'written': 0, 'unchanged': 0, 'removed': 0}
+
+    def template_hash(self, name):
+        """Hash of a template and, recursively, every template it extends, includes or imports."""
+        if name not in self.template_hashes:
+            self.template_hashes[name] = ''  # Guards against include cycles
+            env = self.app.jinja_env
+            source, _, _ = env.loader.get_source(env, name)
+            digest = hashlib.sha1(source.encode())
+            for child in sorted(filter(None, meta.find_referenced_templates(env.parse(source)))):
+                digest.update(self.template_hash(child).encode())
+            self.template_hashes[name] = digest.hexdigest()
+        return self.template_hashes[name]
+
+    def freeze(self, key, path, template, render, inputs, version=None, status=200, filename=None):
+        """Render and write one snapshot unless its inputs are unchanged since the last build."""
+        inputs = hashlib.sha1(f'{self.template_hash(template)}|{self.asset_version}|{inputs}'.encode()).hexdigest()
+        filename = filename or _file_for(path)
+        previous = self.previous.get(key)
+        if previous and previous['inputs'] == inputs and os.path.exists(os.path.join(self.store.directory, filename)):
+            self.manifest[key] = previous
+            self.counts['unchanged'] += 1
+            return
+        with self.app.test_request_context(path):
+            html = render().encode()
+        self.counts['rendered'] += 1
+        etag = hashlib.sha1(html).hexdigest()[:20]
+        encodings = sorted(self.compressors)
+        if not (previous and previous['etag'] == etag and previous['file'] == filename
+                and previous['encodings'] == encodings):
+            write_variants(os.path.join(self.store.directory, filename), html, self.compressors)
+            self.counts['written'] += 1
+        self.manifest[key] = {'file': filename, 'inputs': inputs, 'etag': etag, 'version': version,
+                              'status': status, 'encodings': encodings}
+
+    def finish(self):
+        for key, entry in self.previous.items():
+            if key not in self.manifest:  # Page no longer exists, e.g. a deleted post
+                for suffix in ('',) + tuple(suffix for _, suffix in ENCODINGS):
+                    try:
+                        os.remove(os.path.join(self.store.directory, entry['file'] + suffix))
+                    except OSError:
+                        pass
+                self.counts['removed'] += 1
+        write_atomic(os.path.join(self.store.directory, MANIFEST),
+                      json.dumps(self.manifest, indent=1, sort_keys=True).encode())
+
+
+@click.command('freeze')
+@click.option('--posts', is_flag=True, help='Also snapshot every post.')
+@click.option('--force', is_flag=True, help='Ignore the previous manifest and rebuild everything.')
+@with_appcontext
+def freeze_command(posts, force):
+    """Render public pages to precompressed static snapshots."""
+    from extensions import db  # Imported here: extensions imports this module
+    from models import Blog
+    from rendering import ensure_html, post_version
+
+    app = current_app._get_current_object()
+    store = app.extensions['snapshots']
+    freezer = Freezer(app, store, force=force)
+
+    for path, (template, context) in store.pages.items():
+        freezer.freeze(path, path, template, lambda: render_template(template, **context),
+                       json.dumps(context, sort_keys=True, default=str))
+    for code, (template, context) in store.error_pages.items():
+        freezer.freeze(f'error:{code}', '/', template, lambda: render_template(template, **context),
+                       json.dumps(context, sort_keys=True, default=str), status=code,
+                       filename=os.path.join('_errors', f'{code}.html'))
+
+    if posts:
+        stmt = db.select(Blog).options(selectinload(Blog.author), selectinload(Blog.tags)).execution_options(yield_per=500)
+        for blog in db.session.scalars(stmt):
+            version = post_version(blog.updated_at)
+
+            def render_post(blog=blog):
+                ensure_html(db, Blog, blog)
+                g._login_user = blog.author  # Posts are members-only; render the logged-in navbar
+                return render_template('blog_detail.html', title=blog.title, blog=blog)
+            freezer.freeze(f'/blog/{blog.id}', f'/blog/{blog.id}', 'blog_detail.html', render_post,
+                           version, version=version)
+
+    freezer.finish()
+    counts = freezer.counts
+    click.echo(f"Froze {len(freezer.manifest)} pages into {store.directory}: {counts['rendered']} rendered, "
+               f"{counts['written']} written, {counts['unchanged']} unchanged, {counts['removed']} removed.")
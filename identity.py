@@ -0,0 +1,126 @@
+"""User datastore with a short-lived in-process identity cache.
+
+Flask-Security looks the logged-in user up by ``fs_uniquifier`` on every
+request, and the roles are read straight afterwards when the identity is
+loaded. The user row and its roles are fetched together in one joined query,
+and a snapshot of both is kept for IDENTITY_CACHE_TTL seconds. A cache hit is
+merged into the request's session without touching the database.
+
+The cache is per process: a change made in another worker is picked up when
+the entry expires, which is why the TTL is kept short. Changes made in this
+process (deactivation, role changes, deletion) evict the entry once the
+transaction that made them commits; evicting at flush time would let a
+concurrent request re-cache the old row before the commit.
+"""
+import weakref
+
+from flask_security import SQLAlchemyUserDatastore
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from page_cache import CacheStats, LRUBackend
+
+_datastores = weakref.WeakSet()  # Every live CachingUserDatastore; the listeners below are shared by all of them
+_PENDING_KEY = 'identity_cache_evictions'
+
+
+def _evict_everywhere(uniquifiers):
+    for datastore in list(_datastores):
+        for uniquifier in uniquifiers:
+            datastore.evict(uniquifier)
+
+
+def _schedule_eviction(target, uniquifiers):
+    session = object_session(target)
+    if session is None:
+        _evict_everywhere(uniquifiers)
+    else:
+        session.info.setdefault(_PENDING_KEY, set()).update(uniquifiers)
+
+
+def _collect_changed_user(mapper, connection, target):
+    history = inspect(target).attrs.fs_uniquifier.history
+    _schedule_eviction(target, list(history.deleted or ()) + [target.fs_uniquifier])
+
+
+def _collect_role_change(target, value, initiator):
+    _schedule_eviction(target, [target.fs_uniquifier])
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_committed(session):
+    _evict_everywhere(session.info.pop(_PENDING_KEY, ()))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)  # The cached snapshots still match the database
+
+
+class CachingUserDatastore(SQLAlchemyUserDatastore):
+
+    def __init__(self, db, user_model, role_model, ttl=30, max_entries=10000, volatile_attributes=()):
+        super().__init__(db, user_model, role_model)
+        self.ttl = ttl
+        # Columns that change outside the user's own writes are left out of snapshots and loaded on access
+        self.volatile_attributes = set(volatile_attributes)
+        self.stats = CacheStats()
+        self._cache = LRUBackend(self.stats, max_entries=max_entries, ttl=ttl)
+        self._register_invalidation()
+
+    def find_user(self, case_insensitive=False, **kwargs):
+        if self.ttl <= 0 or case_insensitive or list(kwargs) != ['fs_uniquifier']:
+            return super().find_user(case_insensitive=case_insensitive, **kwargs)
+        uniquifier = kwargs['fs_uniquifier']
+        entry = self._cache.get(uniquifier)
+        if entry is not None:
+            self.stats.incr('hits')
+            return self._restore(entry[1])
+        self.stats.incr('misses')
+        user = self.db.session.scalar(
+            select(self.user_model)
+            .options(joinedload(self.user_model.roles))
+            .where(self.user_model.fs_uniquifier == uniquifier)
+        )
+        if user is not None:
+            self._cache.set(uniquifier, None, self._snapshot(user))
+        return user
+
+    def evict(self, fs_uniquifier):
+        self._cache.delete(fs_uniquifier)
+
+    def _snapshot(self, user):
+        columns = {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(self.user_model).column_attrs
+            if attr.key not in self.volatile_attributes
+        }
+        roles = [
+            {attr.key: getattr(role, attr.key) for attr in inspect(self.role_model).column_attrs}
+            for role in user.roles
+        ]
+        return columns, roles
+
+    def _restore(self, snapshot):
+        # Rebuild detached instances and merge them without a SELECT; missing columns load lazily if read
+        columns, roles = snapshot
+        role_objects = []
+        for role_columns in roles:
+            role = self.role_model(**role_columns)
+            make_transient_to_detached(role)
+            role_objects.append(role)
+        user = self.user_model(**columns)
+        set_committed_value(user, 'roles', role_objects)  # Loaded state, so no change events or history
+        make_transient_to_detached(user)
+        return self.db.session.merge(user, load=False)
+
+    def _register_invalidation(self):
+        _datastores.add(self)
+        user_model = self.user_model
+        # Once per model, however many apps are created
+        if not event.contains(user_model, 'after_update', _collect_changed_user):
+            event.listen(user_model, 'after_update', _collect_changed_user)
+            event.listen(user_model, 'after_delete', _collect_changed_user)
+            event.listen(user_model.roles, 'append', _collect_role_change)
+            event.listen(user_model.roles, 'remove', _collect_role_change)
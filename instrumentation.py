@@ -0,0 +1,346 @@
+"""Per-request query counting and opt-in hot-path instrumentation.
+
+``init_query_counter`` is always installed and only counts statements.
+``Instrumentation`` is enabled with INSTRUMENTATION_ENABLED and adds:
+
+* timing of each request phase - SQL, template rendering, password hashing,
+  the Flask handler as a whole, and the full WSGI call including response
+  iteration;
+* a Prometheus text endpoint at /metrics (per process - scrape every worker),
+  served only to the addresses in METRICS_ALLOWED_IPS;
+* a ``Server-Timing`` header so browser dev tools show the breakdown of the
+  handler. A streamed page renders after its headers have gone, so the
+  per-endpoint metrics are recorded when the response is closed, and the
+  request's full totals are logged at INFO level at the same time;
+* sampled cProfile capture that keeps dumps of the slowest N requests.
+"""
+import cProfile
+import heapq
+import ipaddress
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, abort, g, has_app_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from werkzeug.wsgi import ClosingIterator
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ('db', 'tpl', 'hash')  # Timed sub-phases reported alongside the total handler time
+
+logger = logging.getLogger(__name__)
+
+
+def init_query_counter(app, db):
+    """Count SQL statements per request; report them in X-Query-Count and the debug log."""
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        count_queries(engine)
+
+    @app.after_request
+    def _report_query_count(response):
+        if app.debug or app.config.get('QUERY_COUNT_HEADER'):
+            count = g.get('query_count', 0)
+            response.headers['X-Query-Count'] = str(count)
+            app.logger.debug('%s %s ran %d queries', request.method, request.path, count)
+        return response
+
+
+def count_queries(engine):
+    """Add the statements `engine` runs to the current request's X-Query-Count."""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_app_context():
+            g.query_count = g.get('query_count', 0) + 1
+
+
+def record_phase(name, seconds):
+    """Add `seconds` to the current request's total for phase `name`."""
+    if has_app_context():
+        phases = g.setdefault('phase_times', defaultdict(float))
+        phases[name] += seconds
+
+
+@contextmanager
+def time_phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels) + '}'
+
+
+class Metrics:
+    """Thread-safe counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._collectors = []
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, labels=(), value=1.0):
+        with self._lock:
+            self._counters[(name, tuple(labels))] += value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * len(DURATION_BUCKETS) + [0.0, 0]  # buckets, sum, count
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[index] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def add_collector(self, name, help_text, collect):
+        """Register a gauge family; `collect()` returns {label_value: number} keyed by a `source` label."""
+        self.describe(name, 'gauge', help_text)
+        self._collectors.append((name, collect))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        by_name = defaultdict(list)
+        for (name, labels), value in counters.items():
+            by_name[name].append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), histogram in histograms.items():
+            for bound, count in zip(DURATION_BUCKETS, histogram):
+                by_name[name].append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {count}')
+            by_name[name].append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram[-1]}')
+            by_name[name].append(f'{name}_sum{_format_labels(labels)} {histogram[-2]}')
+            by_name[name].append(f'{name}_count{_format_labels(labels)} {histogram[-1]}')
+        for name, collect in self._collectors:
+            for label, value in collect().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue  # Only numeric samples are valid in the exposition format
+                by_name[name].append(f'{name}{_format_labels((("source", label),))} {value}')
+        for name in sorted(by_name):
+            kind, help_text = self._help.get(name, ('untyped', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(by_name[name])
+        return '\n'.join(lines) + '\n'
+
+
+class SlowRequestProfiler:
+    """Profile a random sample of requests and keep cProfile dumps of the slowest `keep` of them."""
+
+    def __init__(self, directory, keep=10, sample_rate=0.0):
+        self.directory = directory
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self._kept = []  # min-heap of (duration, path)
+        self._kept_lock = threading.Lock()
+        self._active = threading.Lock()  # Only one profiler may run at a time in a process
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, duration, label):
+        profile.disable()
+        self._active.release()
+        with self._kept_lock:
+            if len(self._kept) >= self.keep and duration <= self._kept[0][0]:
+                return
+            filename = f'{duration * 1000:09.1f}ms-{label}-{os.getpid()}-{int(time.time() * 1000)}.prof'
+            path = os.path.join(self.directory, filename)
+            profile.dump_stats(path)
+            heapq.heappush(self._kept, (duration, path))
+            if len(self._kept) > self.keep:
+                _, evicted = heapq.heappop(self._kept)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+
+
+class WSGITimer:
+    """Time the whole WSGI call, including streaming the response body, outside Flask's handler."""
+
+    def __init__(self, wsgi_app, metrics):
+        self.wsgi_app = wsgi_app
+        self.metrics = metrics
+
+    def __call__(self, environ, start_response):
+        started = time.perf_counter()
+
+        def observe():
+            self.metrics.observe('wsgi_request_duration_seconds', (), time.perf_counter() - started)
+
+        return ClosingIterator(self.wsgi_app(environ, start_response), [observe])
+
+
+class Instrumentation:
+    """Flask extension wiring the timers, /metrics and Server-Timing into an app."""
+
+    def __init__(self, app=None, db=None):
+        self.metrics = Metrics()
+        self.profiler = None
+        self.allowed_networks = ()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.extensions['instrumentation'] = self
+        if not app.config.get('INSTRUMENTATION_ENABLED'):
+            return
+        metrics = self.metrics
+        metrics.describe('http_requests_total', 'counter', 'Requests handled, by endpoint, method and status.')
+        metrics.describe('http_request_duration_seconds', 'histogram', 'Request time by endpoint, including a streamed body.')
+        metrics.describe('wsgi_request_duration_seconds', 'histogram', 'Full WSGI call time including body iteration.')
+        metrics.describe('request_phase_seconds_total', 'counter', 'Time spent in each request phase, by endpoint.')
+        metrics.describe('db_queries_total', 'counter', 'SQL statements executed, by endpoint.')
+
+        if app.config.get('PROFILE_SAMPLE_RATE', 0) > 0:
+            self.profiler = SlowRequestProfiler(
+                os.path.join(app.instance_path, app.config.get('PROFILE_DIR', 'profiles')),
+                keep=app.config.get('PROFILE_KEEP_SLOWEST', 10),
+                sample_rate=app.config['PROFILE_SAMPLE_RATE'],
+            )
+
+        self._install_sql_timers(app, db)
+        self._install_template_timers(app)
+        self._install_request_hooks(app)
+        app.wsgi_app = WSGITimer(app.wsgi_app, metrics)
+        self.allowed_networks = tuple(ipaddress.ip_network(net, strict=False)
+                                      for net in app.config.get('METRICS_ALLOWED_IPS', ('127.0.0.1', '::1')))
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def instrument_password_context(self, crypt_context):
+        """Attribute passlib hash/verify time on `crypt_context` to the 'hash' phase."""
+        for method_name in ('hash', 'verify', 'verify_and_update'):
+            method = getattr(crypt_context, method_name)
+
+            def timed(*args, _method=method, **kwargs):
+                with time_phase('hash'):
+                    return _method(*args, **kwargs)
+            setattr(crypt_context, method_name, wraps(method)(timed))
+
+    def metrics_view(self):
+        # Scrapers can't log in, so access is by source address; a 404 doesn't advertise the endpoint
+        if not self._scraper_allowed(request.remote_addr):
+            abort(404)
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    def _scraper_allowed(self, remote_addr):
+        try:
+            address = ipaddress.ip_address(remote_addr or '')
+        except ValueError:
+            return False
+        return any(address in network for network in self.allowed_networks)
+
+    def _install_sql_timers(self, app, db):
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            # Start times are keyed by execution context, so a statement that fails can't skew later ones
+            @event.listens_for(engine, 'before_cursor_execute')
+            def _start_query(conn, cursor, statement, parameters, context, executemany):
+                conn.info.setdefault('query_started', {})[context] = time.perf_counter()
+
+            @event.listens_for(engine, 'after_cursor_execute')
+            def _end_query(conn, cursor, statement, parameters, context, executemany):
+                started = conn.info.get('query_started', {}).pop(context, None)
+                if started is not None:
+                    record_phase('db', time.perf_counter() - started)
+
+            @event.listens_for(engine, 'handle_error')
+            def _fail_query(exception_context):
+                conn = exception_context.connection
+                if conn is None:
+                    return  # Failed to connect; nothing was started
+                started = conn.info.get('query_started', {}).pop(exception_context.execution_context, None)
+                if started is not None:
+                    record_phase('db', time.perf_counter() - started)
+
+    def _install_template_timers(self, app):
+        def _start_render(sender, template, context, **extra):
+            g.setdefault('render_started', []).append(time.perf_counter())
+
+        def _end_render(sender, template, context, **extra):
+            record_phase('tpl', time.perf_counter() - g.render_started.pop())
+
+        before_render_template.connect(_start_render, app, weak=False)
+        template_rendered.connect(_end_render, app, weak=False)
+
+    def _install_request_hooks(self, app):
+        @app.before_request
+        def _start_request():
+            g.request_started = time.perf_counter()
+            g.profile = self.profiler.start() if self.profiler else None
+
+        @app.after_request
+        def _finish_request(response):
+            started = g.get('request_started')
+            if started is None:
+                return response
+            phases = g.setdefault('phase_times', defaultdict(float))  # Streamed rendering adds to this same dict
+            if app.config.get('SERVER_TIMING_HEADER', True):
+                # Headers leave before a streamed body is rendered, so this covers the handler only
+                timings = [f'{phase};dur={phases.get(phase, 0.0) * 1000:.2f}' for phase in PHASES]
+                timings.append(f'app;dur={(time.perf_counter() - started) * 1000:.2f}')
+                response.headers['Server-Timing'] = ', '.join(timings)
+            request_g = g._get_current_object()  # Gone from the context stack by the time the body is closed
+            labels = (request.endpoint or 'unmatched', request.method, request.path, response.status_code)
+            response.call_on_close(lambda: self._record_request(request_g, started, *labels))
+            # The body's time belongs in the profile too, so the close hook owns the profiler from here on
+            request_g.close_profile = request_g.pop('profile', None)
+            return response
+
+        @app.teardown_request
+        def _finish_profile(exc):
+            # Runs even when the view raised, so the profiler slot is always released
+            profile = g.pop('profile', None)
+            if profile is not None:
+                duration = time.perf_counter() - g.request_started
+                self.profiler.finish(profile, duration, request.endpoint or 'unmatched')
+
+    def _record_request(self, request_g, started, endpoint, method, path, status):
+        # Called when the WSGI server closes the response: streamed bodies have been rendered by now
+        duration = time.perf_counter() - started
+        metrics = self.metrics
+        phases = request_g.phase_times
+        queries = request_g.get('query_count', 0)
+        metrics.inc('http_requests_total', (('endpoint', endpoint), ('method', method), ('status', status)))
+        metrics.observe('http_request_duration_seconds', (('endpoint', endpoint),), duration)
+        metrics.inc('db_queries_total', (('endpoint', endpoint),), queries)
+        for phase, seconds in phases.items():
+            metrics.inc('request_phase_seconds_total', (('endpoint', endpoint), ('phase', phase)), seconds)
+        profile = request_g.pop('close_profile', None)
+        if profile is not None:
+            self.profiler.finish(profile, duration, endpoint)
+        logger.info('%s %s %s: %s, app %.2f ms, %d queries', method, path, status,
+                    ', '.join(f'{phase} {phases.get(phase, 0.0) * 1000:.2f} ms' for phase in PHASES),
+                    duration * 1000, queries)
@@ -0,0 +1,261 @@
+"""Database-backed background job queue.
+
+Jobs are rows in the ``job`` table, so enqueueing is an INSERT in the caller's
+own transaction: a job exists if and only if the write that produced it was
+committed. Workers claim jobs with a conditional UPDATE, run the registered
+handler, and either mark the job done or reschedule it with exponential
+backoff until ``max_attempts`` is reached.
+
+Handlers are registered by name with ``@queue.handler('name')``. Event fan-out
+goes through ``queue.subscribe(event, handler_name)`` and
+``queue.publish(event, payload, key)``, which enqueues one job per subscriber.
+An idempotency key makes enqueueing the same work twice a no-op.
+
+JOBS_MODE selects how jobs run:
+
+* ``thread``   - JOBS_WORKERS daemon threads per app process (default);
+* ``external`` - only ``flask jobs work`` processes run jobs;
+* ``inline``   - jobs run at the end of the request that enqueued them
+  (development and tests).
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, g, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import event, func, or_, select, update
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class JobQueue:
+
+    def __init__(self, app=None, db=None, job_model=None):
+        self.handlers = {}
+        self.subscribers = defaultdict(list)
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._threads_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db, job_model)
+
+    def init_app(self, app, db, job_model):
+        self.app = app
+        self.db = db
+        self.Job = job_model
+        self.mode = app.config.get('JOBS_MODE', 'thread')
+        self.workers = app.config.get('JOBS_WORKERS', 1)
+        self.max_attempts = app.config.get('JOBS_MAX_ATTEMPTS', 5)
+        self.poll_interval = app.config.get('JOBS_POLL_INTERVAL', 2.0)
+        self.lock_timeout = app.config.get('JOBS_LOCK_TIMEOUT', 300)
+        app.extensions['jobs'] = self
+
+        @event.listens_for(db.session, 'after_commit')
+        def _jobs_committed(session):
+            if not session.info.pop('jobs_enqueued', False):
+                return
+            if self.mode != 'inline':
+                self._wakeup.set()  # Idle workers pick the new jobs up immediately instead of at the next poll
+            elif has_app_context():
+                g.jobs_pending = True  # The session cannot run SQL inside its own commit; run after the view
+
+        if self.mode == 'inline':
+            @app.after_request
+            def _run_inline_jobs(response):
+                if g.pop('jobs_pending', False):
+                    self.run_pending()
+                return response
+        elif self.mode == 'thread':
+            # Start lazily so forked server workers each get their own threads
+            app.before_request(self.start_threads)
+
+    # Registration
+
+    def handler(self, name):
+        def decorator(func):
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def subscribe(self, event_name, handler_name):
+        if handler_name not in self.subscribers[event_name]:
+            self.subscribers[event_name].append(handler_name)
+
+    # Producing jobs
+
+    def enqueue(self, name, payload=None, key=None, delay=0, max_attempts=None):
+        """Add a job to the current transaction; returns the existing job if `key` was already used."""
+        if name not in self.handlers:
+            raise KeyError(f'No job handler registered for {name!r}')
+        session = self.db.session
+        if key is not None:
+            existing = session.scalar(select(self.Job).where(self.Job.idempotency_key == key))
+            if existing is not None:
+                return existing
+        job = self.Job(
+            name=name,
+            payload=json.dumps(payload or {}),
+            idempotency_key=key,
+            status=QUEUED,
+            max_attempts=max_attempts or self.max_attempts,
+            run_after=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        session.add(job)
+        session.info['jobs_enqueued'] = True
+        return job
+
+    def publish(self, event_name, payload, key):
+        """Enqueue one job per handler subscribed to `event_name`, keyed by handler and `key`."""
+        return [self.enqueue(name, payload, key=f'{name}:{key}') for name in self.subscribers[event_name]]
+
+    # Consuming jobs
+
+    def claim(self):
+        """Atomically take the oldest runnable job; returns its id or None."""
+        Job, session = self.Job, self.db.session
+        now = datetime.utcnow()
+        runnable = or_(
+            (Job.status == QUEUED) & (Job.run_after <= now),
+            # A running job whose worker died is retried once its lock expires
+            (Job.status == RUNNING) & (Job.locked_at < now - timedelta(seconds=self.lock_timeout)),
+        )
+        for _ in range(5):  # Another worker may win the race for a candidate; try the next one
+            candidate = session.execute(
+                select(Job.id, Job.status, Job.locked_at).where(runnable).order_by(Job.id).limit(1)
+            ).first()
+            if candidate is None:
+                session.rollback()
+                return None
+            claimed = session.execute(
+                update(Job)
+                .where(Job.id == candidate.id, Job.status == candidate.status)
+                .where(Job.locked_at.is_(None) if candidate.locked_at is None else Job.locked_at == candidate.locked_at)
+                .values(status=RUNNING, locked_at=now, attempts=Job.attempts + 1)
+            ).rowcount
+            session.commit()
+            if claimed:
+                return candidate.id
+        return None
+
+    def run_one(self):
+        """Claim and run a single job; returns False when nothing was runnable."""
+        job_id = self.claim()
+        if job_id is None:
+            return False
+        session = self.db.session
+        job = session.get(self.Job, job_id)
+        try:
+            self.handlers[job.name](**json.loads(job.payload))
+        except Exception as exc:
+            session.rollback()
+            job = session.get(self.Job, job_id)
+            job.last_error = f'{type(exc).__name__}: {exc}'
+            if job.attempts >= job.max_attempts:
+                job.status = FAILED
+                logger.exception('Job %s (%s) failed permanently', job.id, job.name)
+            else:
+                job.status = QUEUED
+                job.run_after = datetime.utcnow() + timedelta(seconds=min(2 ** job.attempts, 600))
+                logger.warning('Job %s (%s) failed, retrying: %s', job.id, job.name, exc)
+            job.locked_at = None
+        else:
+            job = session.get(self.Job, job_id)
+            job.status = DONE
+            job.locked_at = None
+        session.commit()
+        return True
+
+    def run_pending(self):
+        """Run jobs until none are runnable (used by inline mode and `flask jobs work --burst`)."""
+        count = 0
+        while self.run_one():
+            count += 1
+        return count
+
+    def work(self, stop_event=None):
+        """Worker loop: run jobs, sleeping until woken or polled when the queue is empty."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            with self.app.app_context():
+                try:
+                    ran = self.run_one()
+                except Exception:
+                    logger.exception('Job worker error')
+                    ran = False
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def start_threads(self):
+        if self._threads:
+            return
+        with self._threads_lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self.work, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+
+jobs_cli = AppGroup('jobs', help='Run and inspect background jobs.')
+
+
+def _queue():
+    return current_app.extensions['jobs']
+
+
+@jobs_cli.command('work')
+@click.option('--concurrency', default=1, show_default=True, help='Worker threads in this process.')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty instead of polling forever.')
+def work_command(concurrency, burst):
+    """Process queued jobs."""
+    queue = _queue()
+    if burst:
+        click.echo(f'Ran {queue.run_pending()} jobs.')
+        return
+    stop = threading.Event()
+    threads = [threading.Thread(target=queue.work, args=(stop,), name=f'job-cli-{i}-{uuid.uuid4().hex[:6]}')
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    click.echo(f'Working with {concurrency} threads; Ctrl+C to stop.')
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+        queue._wakeup.set()
+        for thread in threads:
+            thread.join()
+
+
+@jobs_cli.command('status')
+def status_command():
+    """Show job counts by status."""
+    queue = _queue()
+    rows = queue.db.session.execute(
+        select(queue.Job.status, func.count()).group_by(queue.Job.status)
+    ).all()
+    for status, count in sorted(rows):
+        click.echo(f'{status:8} {count}')
+
+
+@jobs_cli.command('retry-failed')
+def retry_failed_command():
+    """Requeue every permanently failed job."""
+    queue = _queue()
+    result = queue.db.session.execute(
+        update(queue.Job).where(queue.Job.status == FAILED)
+        .values(status=QUEUED, attempts=0, run_after=datetime.utcnow(), last_error=None)
+    )
+    queue.db.session.commit()
+    click.echo(f'Requeued {result.rowcount} jobs.')
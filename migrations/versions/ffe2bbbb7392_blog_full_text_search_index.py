@@ -0,0 +1,46 @@
+"""blog full-text search index
+
+Revision ID: ffe2bbbb7392
+Revises: 902e95db5709
+Create Date: 2026-10-16 19:11:25.414565
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'ffe2bbbb7392'
+down_revision = '902e95db5709'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of search.FTS_DDL at the time of this migration
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_fts USING fts5("
+    "title, content, content='blog', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_ai AFTER INSERT ON blog BEGIN "
+    "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_ad AFTER DELETE ON blog BEGIN "
+    "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_au AFTER UPDATE OF title, content ON blog BEGIN "
+    "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases simply have no search index
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in FTS_DDL:
+        op.execute(statement)
+    # Index the posts that already exist
+    op.execute("INSERT INTO blog_fts(blog_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('blog_fts_au', 'blog_fts_ad', 'blog_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS blog_fts")
@@ -0,0 +1,241 @@
+"""Database models and the ORM events that keep derived data in step with them."""
+import math
+import re
+from collections import Counter
+from datetime import datetime
+
+from flask_security import UserMixin, RoleMixin
+from sqlalchemy import event, inspect
+
+from extensions import db, page_cache
+from rendering import RENDERER_VERSION, render_markdown
+from search import register_fts_ddl
+
+# Association table for many-to-many relationship between User and Role
+roles_users = db.Table(
+    'roles_users',
+    db.Column('user_id', db.Integer(), db.ForeignKey('user.id')),
+    db.Column('role_id', db.Integer(), db.ForeignKey('role.id'))
+)
+
+# Models
+class Role(db.Model, RoleMixin):
+    id = db.Column(db.Integer(), primary_key=True)
+    name = db.Column(db.String(80), unique=True)
+    description = db.Column(db.String(255))
+
+class User(db.Model, UserMixin):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(255), unique=True, nullable=False)
+    password = db.Column(db.String(255), nullable=False)
+    active = db.Column(db.Boolean(), default=True)
+    fs_uniquifier = db.Column(db.String(255), unique=True, nullable=False)  # Required by Flask-Security
+    posts_version = db.Column(db.Integer, nullable=False, default=0)  # Bumped whenever one of the user's posts changes
+    roles = db.relationship(
+        'Role',
+        secondary=roles_users,
+        backref=db.backref('users', lazy='dynamic')
+    )
+
+EXCERPT_LENGTH = 200  # Characters of content shown in list views
+WORDS_PER_MINUTE = 200  # Reading speed used for the reading-time estimate
+
+def summarize_content(content):
+    """Return the (excerpt, word_count, reading_time) stored alongside a post body."""
+    content = content or ''
+    word_count = len(content.split())
+    reading_time = max(1, math.ceil(word_count / WORDS_PER_MINUTE))  # Minutes, never shown as zero
+    return content[:EXCERPT_LENGTH], word_count, reading_time
+
+# Association table for many-to-many relationship between Blog and Tag
+blog_tags = db.Table(
+    'blog_tags',
+    db.Column('blog_id', db.Integer(), db.ForeignKey('blog.id'), primary_key=True),
+    db.Column('tag_id', db.Integer(), db.ForeignKey('tag.id'), primary_key=True),
+    db.Index('ix_blog_tags_tag_blog', 'tag_id', 'blog_id'),  # Serves the per-tag listing
+)
+
+TAG_NAME_LENGTH = 50
+
+def slugify(name):
+    """URL form of a tag name: lower-case words joined by hyphens."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(TAG_NAME_LENGTH), nullable=False)
+    slug = db.Column(db.String(TAG_NAME_LENGTH), unique=True, nullable=False)
+    post_count = db.Column(db.Integer, nullable=False, default=0, index=True)  # Maintained by _count_posts
+
+def find_or_create_tags(names):
+    """Tags for `names`, matched by slug; missing ones are added to the session. Blank names are ignored."""
+    wanted = {}
+    for name in names:
+        name = name.strip()[:TAG_NAME_LENGTH]
+        slug = slugify(name)
+        if slug and slug not in wanted:
+            wanted[slug] = name
+    if not wanted:
+        return []
+    existing = {tag.slug: tag for tag in Tag.query.filter(Tag.slug.in_(wanted))}
+    tags = []
+    for slug, name in wanted.items():
+        tag = existing.get(slug)
+        if tag is None:
+            tag = Tag(name=name, slug=slug)
+            db.session.add(tag)
+        tags.append(tag)
+    return tags
+
+class ArchiveMonth(db.Model):
+    """Posts per calendar month, maintained by _count_posts so archive navigation never runs GROUP BY."""
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+
+class Blog(db.Model):
+    __table_args__ = (
+        # Serves the dashboard's keyset scan: author_id = ? ORDER BY date_posted DESC, id DESC
+        db.Index('ix_blog_author_date_id', 'author_id', 'date_posted', 'id'),
+        # Serves the feeds' newest-first scan over every author: ORDER BY date_posted DESC, id DESC
+        db.Index('ix_blog_date_posted_id', 'date_posted', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    content = db.Column(db.Text, nullable=False)  # Markdown source
+    content_html = db.Column(db.Text)  # Sanitized rendering of content, shown by the detail page
+    # RENDERER_VERSION that produced content_html
+    content_html_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    excerpt = db.Column(db.String(EXCERPT_LENGTH), nullable=False, default='')  # Stored preview so lists never load content
+    word_count = db.Column(db.Integer, nullable=False, default=0)
+    reading_time = db.Column(db.Integer, nullable=False, default=1)  # Estimated minutes to read
+    date_posted = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last modification, versions cached pages
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    author = db.relationship('User', backref=db.backref('blog_posts', lazy=True))
+    tags = db.relationship('Tag', secondary=blog_tags, order_by='Tag.name', backref=db.backref('posts', lazy='dynamic'))
+
+class Subscriber(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(255), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    confirmed = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # Set by the emailed link
+
+class Job(db.Model):
+    __table_args__ = (
+        # Serves the worker's claim scan: status = 'queued' AND run_after <= now ORDER BY id
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # Registered handler to run
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments for the handler
+    idempotency_key = db.Column(db.String(255), unique=True)  # Enqueueing the same key twice is a no-op
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not claimed before this (retry backoff)
+    locked_at = db.Column(db.DateTime)  # When a worker claimed it; stale locks are reclaimed
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# Keep the precomputed summary columns and rendered HTML in step with the body whenever content is assigned
+@event.listens_for(Blog.content, 'set')
+def _update_summary(target, value, oldvalue, initiator):
+    target.excerpt, target.word_count, target.reading_time = summarize_content(value)
+    target.content_html, target.content_html_version = render_markdown(value), RENDERER_VERSION
+
+# Tags are shown on the post page, so a change to them is a new version of it (ETag, snapshot, page cache)
+@event.listens_for(Blog.tags, 'append')
+@event.listens_for(Blog.tags, 'remove')
+def _touch_on_tag_change(target, value, initiator):
+    if inspect(target).has_identity:  # New posts get their updated_at default on insert
+        target.updated_at = datetime.utcnow()
+
+register_fts_ddl(Blog.__table__)  # FTS5 index and sync triggers for db.create_all() on SQLite
+
+# Drop any cached rendering of a post as soon as it is written or removed
+@event.listens_for(Blog, 'after_insert')
+@event.listens_for(Blog, 'after_update')
+@event.listens_for(Blog, 'after_delete')
+def _invalidate_cached_page(mapper, connection, target):
+    page_cache.invalidate(f'blog:{target.id}')
+
+# Version the author's post list so list pages can be revalidated without querying it
+@event.listens_for(Blog, 'after_insert')
+@event.listens_for(Blog, 'after_update')
+@event.listens_for(Blog, 'after_delete')
+def _bump_posts_version(mapper, connection, target):
+    users = User.__table__
+    connection.execute(
+        users.update().where(users.c.id == target.author_id).values(posts_version=users.c.posts_version + 1)
+    )
+
+# Keep Tag.post_count and ArchiveMonth in step with the posts written by each flush
+@event.listens_for(db.session, 'before_flush')
+def _load_tags_of_deleted_posts(session, flush_context, instances):
+    for obj in session.deleted:
+        if isinstance(obj, Blog):
+            obj.tags  # Loaded now: the flush deletes the association rows _count_posts needs
+
+def _month(date_posted):
+    return (date_posted.year, date_posted.month) if date_posted is not None else None
+
+@event.listens_for(db.session, 'after_flush')
+def _count_posts(session, flush_context):
+    # new/dirty/deleted and attribute history still describe the flush that just ran
+    months, tags = Counter(), Counter()
+    for obj in session.new:
+        if isinstance(obj, Blog):
+            months[_month(obj.date_posted)] += 1
+            tags.update(tag.id for tag in obj.tags)
+    for obj in session.deleted:
+        if isinstance(obj, Blog):
+            months[_month((inspect(obj).attrs.date_posted.history.deleted or [obj.date_posted])[0])] -= 1
+            tags.subtract(tag.id for tag in obj.tags)
+    for obj in session.dirty:
+        if not isinstance(obj, Blog):
+            continue
+        state = inspect(obj).attrs
+        added, _, removed = state.tags.history
+        tags.update(tag.id for tag in added)
+        tags.subtract(tag.id for tag in removed)
+        new_date, _, old_date = state.date_posted.history
+        if new_date and old_date:
+            months[_month(new_date[0])] += 1
+            months[_month(old_date[0])] -= 1
+    months.pop(None, None)  # Undated posts are in no month
+    if months or tags:
+        apply_post_counts(session, months, tags)
+
+def apply_post_counts(session, months, tags):
+    """Add {(year, month): delta} and {tag_id: delta} to the counter tables (also used by bulk imports)."""
+    archive, tag_table = ArchiveMonth.__table__, Tag.__table__
+    for (year, month), delta in months.items():
+        if not delta:
+            continue
+        updated = session.execute(
+            archive.update().where(archive.c.year == year, archive.c.month == month)
+            .values(post_count=archive.c.post_count + delta)
+        ).rowcount
+        if not updated:
+            session.execute(archive.insert().values(year=year, month=month, post_count=delta))
+    for tag_id, delta in tags.items():
+        if delta:
+            session.execute(tag_table.update().where(tag_table.c.id == tag_id)
+                               .values(post_count=tag_table.c.post_count + delta))
+
+def recount_post_counts(session):
+    """Rebuild both counter tables from the posts themselves, e.g. after inserting rows with Core."""
+    archive, tag_table, blog = ArchiveMonth.__table__, Tag.__table__, Blog.__table__
+    year, month = db.extract('year', blog.c.date_posted), db.extract('month', blog.c.date_posted)
+    session.execute(archive.delete())
+    session.execute(archive.insert().from_select(
+        ['year', 'month', 'post_count'],
+        db.select(year, month, db.func.count()).where(blog.c.date_posted.is_not(None)).group_by(year, month),
+    ))
+    session.execute(tag_table.update().values(post_count=(
+        db.select(db.func.count()).where(blog_tags.c.tag_id == tag_table.c.id).scalar_subquery()
+    )))
@@ -0,0 +1,140 @@
+"""Subscriber notifications, run as background jobs.
+
+Subscriptions are double opt-in: ``/subscribe`` only records the address and
+mails it a signed confirmation link (valid for SUBSCRIBE_CONFIRM_MAX_AGE
+seconds); nothing else is sent until the link has been followed. Every mail
+carries a signed one-click unsubscribe link, also offered through the
+``List-Unsubscribe`` headers (RFC 8058).
+
+Publishing a post enqueues ``notify_subscribers``, which walks the confirmed
+subscribers in keyset batches and enqueues one ``send_notification`` job per
+address. Each send is its own job with its own idempotency key, so a retry
+after a partial failure only re-sends to the addresses that did not get the
+mail. Posts are for members only, so the excerpt is only mailed to addresses
+that belong to an active account; everyone else gets the title and a link.
+
+Links point at FEEDS_BASE_URL, else ``PREFERRED_URL_SCHEME://SERVER_NAME`` -
+never at the host a request named, which is whatever the client sent. With
+neither configured no mail is sent.
+
+Mail goes through SMTP when MAIL_SERVER is set; otherwise messages are logged,
+which is what development and the benchmarks use.
+"""
+import logging
+import smtplib
+from email.message import EmailMessage
+
+from flask import current_app, url_for
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+logger = logging.getLogger(__name__)
+
+FANOUT_BATCH_SIZE = 500  # Subscribers read per query while fanning out
+CONFIRM_SALT = 'subscription-confirm'
+UNSUBSCRIBE_SALT = 'subscription-unsubscribe'
+
+
+def make_token(email, salt):
+    """Signed, URL-safe token carrying `email`; the salt keeps confirm and unsubscribe tokens apart."""
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=salt).dumps(email)
+
+
+def read_token(token, salt, max_age=None):
+    """The email address in `token`, or None when it is forged, garbled or older than `max_age` seconds."""
+    try:
+        return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=salt).loads(token, max_age=max_age)
+    except BadSignature:  # Includes SignatureExpired
+        return None
+
+
+def external_url(endpoint, **values):
+    """Absolute URL for a link in a mail, or None when no base URL is configured."""
+    base_url = current_app.extensions['feeds'].resolve_base_url()  # The same host the feeds link to
+    if base_url is None:
+        return None
+    with current_app.test_request_context(base_url=base_url):
+        return url_for(endpoint, _external=True, **values)
+
+
+def register_handlers(queue, db, Blog, Subscriber, User):
+    """Register the notification handlers on `queue` and subscribe them to post publication."""
+
+    def send_to_subscriber(email, subject, body):
+        unsubscribe = external_url('main.unsubscribe_confirmed', token=make_token(email, UNSUBSCRIBE_SALT))
+        if unsubscribe is None:  # Every link in the mail shares the base URL, so none of them could be built
+            logger.warning('Mail to %s not sent: set FEEDS_BASE_URL or SERVER_NAME for its links', email)
+            return
+        send_mail(email, subject, f'{body}\n\nUnsubscribe: {unsubscribe}\n', headers={
+            'List-Unsubscribe': f'<{unsubscribe}>',
+            'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click',
+        })
+
+    @queue.handler('confirm_subscription')
+    def confirm_subscription(email):
+        if db.session.scalar(db.select(Subscriber.confirmed).where(Subscriber.email == email)) is not False:
+            return  # Confirmed or unsubscribed since
+        link = external_url('main.confirm_subscription', token=make_token(email, CONFIRM_SALT))
+        send_to_subscriber(email, 'Confirm your subscription',
+                           f'Confirm your subscription to new posts:\n{link}\n\n'
+                           'If you did not ask for this, ignore this mail.')
+
+    @queue.handler('send_unsubscribe_link')
+    def send_unsubscribe_link(email):
+        if db.session.scalar(db.select(Subscriber.id).where(Subscriber.email == email)) is not None:
+            send_to_subscriber(email, 'Unsubscribe from new posts', 'Follow the link below to stop these mails.')
+
+    @queue.handler('notify_subscribers')
+    def notify_subscribers(blog_id, base_url=None):  # base_url: ignored; jobs queued by older releases still send it
+        blog = db.session.get(Blog, blog_id)
+        if blog is None:
+            return  # Deleted before the job ran
+        last_id = 0
+        while True:
+            batch = db.session.execute(
+                db.select(Subscriber.id, Subscriber.email)
+                .where(Subscriber.id > last_id, Subscriber.confirmed)
+                .order_by(Subscriber.id)
+                .limit(FANOUT_BATCH_SIZE)
+            ).all()
+            if not batch:
+                break
+            for subscriber_id, email in batch:
+                queue.enqueue('send_notification', {'blog_id': blog_id, 'email': email},
+                              key=f'send_notification:{blog_id}:{subscriber_id}')
+            db.session.commit()  # Commit per batch so a retry resumes from the enqueued sends
+            last_id = batch[-1][0]
+
+    @queue.handler('send_notification')
+    def send_notification(blog_id, email, base_url=None):  # base_url: as for notify_subscribers
+        blog = db.session.get(Blog, blog_id)
+        if blog is None:
+            return
+        if not db.session.scalar(db.select(Subscriber.confirmed).where(Subscriber.email == email)):
+            return  # Unsubscribed after the fan-out
+        link = external_url('main.blog', blog_id=blog_id)
+        body = f'Read it here: {link}'
+        if db.session.scalar(db.select(User.id).where(User.email == email, User.active)) is not None:
+            body = f'{blog.excerpt}\n\nRead more: {link}'  # Members may see the content itself
+        send_to_subscriber(email, f'New post: {blog.title}', body)
+
+    queue.subscribe('post_published', 'notify_subscribers')
+
+
+def send_mail(recipient, subject, body, headers=None):
+    config = current_app.config
+    if not config.get('MAIL_SERVER'):
+        logger.info('Mail to %s: %s', recipient, subject)
+        return
+    message = EmailMessage()
+    message['From'] = config['MAIL_DEFAULT_SENDER']
+    message['To'] = recipient
+    message['Subject'] = subject
+    for name, value in (headers or {}).items():
+        message[name] = value
+    message.set_content(body)
+    with smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=30) as smtp:
+        if config.get('MAIL_USE_TLS'):
+            smtp.starttls()
+        if config.get('MAIL_USERNAME'):
+            smtp.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        smtp.send_message(message)
@@ -0,0 +1,209 @@
+"""Rendered-page cache for read-heavy views.
+
+Entries are stored under a stable key (for example ``blog:42``) together with
+a version string, usually the row's last-modified time. A lookup only hits when
+the stored version matches the one the caller expects, so a page can never be
+served for an older revision of its row even if an invalidation was missed.
+
+Backends:
+
+* ``memory`` - per-process LRU with size and TTL eviction.
+* ``sqlite`` - a SQLite file shared by every worker process on the host.
+* ``none``   - caching disabled.
+
+Hit/miss/eviction counters are kept per process and exposed by ``stats()``.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class NullBackend:
+    """Backend used when caching is disabled; every lookup misses."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def get(self, key):
+        return None
+
+    def set(self, key, version, body):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class LRUBackend:
+    """In-process least-recently-used cache bounded by entry count and age."""
+
+    def __init__(self, stats, max_entries=1024, ttl=300):
+        self.stats = stats
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, version, body)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self.stats.incr('evictions')
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, version, body):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.incr('evictions')
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Cache stored in a SQLite file so that every worker process shares it."""
+
+    def __init__(self, stats, path, max_entries=1024, ttl=300):
+        self.stats = stats
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS page_cache ('
+            ' key TEXT PRIMARY KEY, version TEXT NOT NULL, body TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL, last_access REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        # sqlite3 connections may not be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute('SELECT version, body, expires_at FROM page_cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[2] < now:
+            conn.execute('DELETE FROM page_cache WHERE key = ?', (key,))
+            self.stats.incr('evictions')
+            return None
+        conn.execute('UPDATE page_cache SET last_access = ? WHERE key = ?', (now, key))
+        return row[0], row[1]
+
+    def set(self, key, version, body):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO page_cache (key, version, body, expires_at, last_access) VALUES (?, ?, ?, ?, ?)',
+            (key, version, body, now + self.ttl, now),
+        )
+        overflow = conn.execute('SELECT COUNT(*) FROM page_cache').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM page_cache WHERE key IN (SELECT key FROM page_cache ORDER BY last_access LIMIT ?)',
+                (overflow,),
+            )
+            self.stats.incr('evictions', overflow)
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM page_cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._connection().execute('DELETE FROM page_cache')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM page_cache').fetchone()[0]
+
+
+class PageCache:
+    """Flask extension wrapping the configured cache backend."""
+
+    def __init__(self, app=None):
+        self.stats = CacheStats()
+        self.backend = NullBackend(self.stats)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('PAGE_CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('PAGE_CACHE_MAX_ENTRIES', 1024)
+        ttl = app.config.get('PAGE_CACHE_TTL', 300)
+        if backend == 'memory':
+            self.backend = LRUBackend(self.stats, max_entries=max_entries, ttl=ttl)
+        elif backend == 'sqlite':
+            path = os.path.join(app.instance_path, app.config.get('PAGE_CACHE_PATH', 'page_cache.db'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(self.stats, path, max_entries=max_entries, ttl=ttl)
+        elif backend == 'none':
+            self.backend = NullBackend(self.stats)
+        else:
+            raise ValueError(f'Unknown PAGE_CACHE_BACKEND: {backend!r}')
+        app.extensions['page_cache'] = self
+
+    def get(self, key, version):
+        """Return the cached body for `key` if it was stored for `version`, else None."""
+        entry = self.backend.get(key)
+        if entry is None or entry[0] != version:
+            self.stats.incr('misses')
+            return None
+        self.stats.incr('hits')
+        return entry[1]
+
+    def set(self, key, version, body):
+        self.backend.set(key, version, body)
+
+    def invalidate(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def info(self):
+        return dict(self.stats.as_dict(), size=len(self.backend), backend=type(self.backend).__name__)
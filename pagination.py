@@ -0,0 +1,120 @@
+"""Keyset (cursor) pagination for listings ordered newest-first by (date, id).
+
+Offset pagination makes the database walk and discard every skipped row, so
+deep pages get slower the further back a reader goes. Keyset pagination instead
+remembers the last (date, id) pair that was shown and asks for rows strictly
+older than it, which an index on the ordering columns answers directly.
+"""
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+CURSOR_SEPARATOR = '_'
+
+
+class KeysetPage:
+    """One page of results plus the cursor for the page after it (or None)."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class KeysetStream:
+    """A page whose rows are fetched in batches while it is being iterated.
+
+    ``next_cursor`` is only known once iteration has finished, so templates
+    must read it after their loop over the rows. When `session` is given
+    (a callable returning the current session, such as a scoped session) the
+    query runs on whatever session is current at iteration time.
+    """
+
+    def __init__(self, query, date_column, id_column, page_size, batch_size, session=None):
+        self._query = query.yield_per(batch_size)
+        self._session = session
+        self._date_key = date_column.key
+        self._id_key = id_column.key
+        self.page_size = page_size
+        self.next_cursor = None
+
+    def __iter__(self):
+        query = self._query if self._session is None else self._query.with_session(self._session())
+        rows = iter(query)
+        last = None
+        try:
+            for count, row in enumerate(rows):
+                if count == self.page_size:  # The extra row: another page exists
+                    self.next_cursor = encode_cursor(getattr(last, self._date_key), getattr(last, self._id_key))
+                    break
+                last = row
+                yield row
+        finally:
+            close = getattr(rows, 'close', None)
+            if close is not None:
+                close()  # Release the cursor even when iteration stops early
+
+
+def encode_cursor(date_value, row_id):
+    return f'{date_value.isoformat()}{CURSOR_SEPARATOR}{row_id}'
+
+
+def decode_cursor(cursor):
+    """Split a cursor back into (datetime, id); raises ValueError if malformed."""
+    date_part, _, id_part = cursor.rpartition(CURSOR_SEPARATOR)
+    if not date_part:
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+    return datetime.fromisoformat(date_part), int(id_part)
+
+
+def clamp_page_size(requested, default, maximum):
+    """Parse a user-supplied page size, falling back to default and capping at maximum."""
+    try:
+        size = int(requested) if requested is not None else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def keyset_paginate(query, date_column, id_column, page_size, after=None):
+    """Return the page of `query` that follows the `after` cursor, newest first.
+
+    One extra row is fetched to learn whether another page exists without a
+    separate COUNT query.
+    """
+    rows = _keyset_query(query, date_column, id_column, page_size, after).all()
+    return _page(rows, date_column, id_column, page_size)
+
+
+async def keyset_paginate_async(session, stmt, date_column, id_column, page_size, after=None):
+    """``keyset_paginate`` for a ``select()`` of ORM entities run on an ``AsyncSession``."""
+    rows = (await session.scalars(_keyset_query(stmt, date_column, id_column, page_size, after))).all()
+    return _page(rows, date_column, id_column, page_size)
+
+
+def keyset_stream(query, date_column, id_column, page_size, after=None, batch_size=50, session=None):
+    """Like ``keyset_paginate``, but rows are fetched `batch_size` at a time as the page renders.
+
+    The cursor is decoded here, so a malformed one still raises ValueError
+    before any response has been started.
+    """
+    query = _keyset_query(query, date_column, id_column, page_size, after)
+    return KeysetStream(query, date_column, id_column, page_size, batch_size, session)
+
+
+def _page(rows, date_column, id_column, page_size):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
+    return KeysetPage(rows, next_cursor)
+
+
+def _keyset_query(query, date_column, id_column, page_size, after):
+    if after:
+        after_date, after_id = decode_cursor(after)
+        query = query.filter(tuple_(date_column, id_column) < (after_date, after_id))
+    return query.order_by(date_column.desc(), id_column.desc()).limit(page_size + 1)  # One extra row to detect a next page
@@ -0,0 +1,89 @@
+"""Password hashing and verification on a bounded process pool.
+
+bcrypt is deliberately slow, and running it on the request worker lets a burst
+of sign-ups or logins starve every other route. ``PooledCryptContext`` stands
+in for Flask-Security's passlib ``CryptContext``: ``hash``, ``verify`` and
+``verify_and_update`` run in worker processes, and everything else
+(``identify``, ``needs_update``...) stays local because it is cheap.
+
+At most ``workers + queue_depth`` operations may be running or waiting at once.
+A caller that cannot get a slot within ``wait_timeout`` seconds gets
+``PasswordPoolSaturated``, which the app turns into a 503 with Retry-After.
+"""
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+_worker_context = None  # CryptContext rebuilt inside each pool process
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when every hashing slot is busy and the wait for one timed out."""
+
+
+def _init_worker(context_config):
+    global _worker_context
+    _worker_context = CryptContext.from_string(context_config)
+
+
+def _run(method_name, args, kwargs):
+    return getattr(_worker_context, method_name)(*args, **kwargs)
+
+
+class PooledCryptContext:
+
+    def __init__(self, crypt_context, workers=2, queue_depth=16, wait_timeout=0.5, start_method='spawn'):
+        self.local_context = crypt_context
+        self.workers = workers
+        self.wait_timeout = wait_timeout
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.local_context, name)
+
+    def hash(self, secret, **kwargs):
+        return self._submit('hash', (secret,), kwargs)
+
+    def verify(self, secret, hash, **kwargs):
+        return self._submit('verify', (secret, hash), kwargs)
+
+    def verify_and_update(self, secret, hash, **kwargs):
+        return self._submit('verify_and_update', (secret, hash), kwargs)
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self):
+        # Created on first use so importing the app, CLI commands and forked workers do not start processes
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.local_context.to_string(),),
+                )
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def _submit(self, method_name, args, kwargs):
+        if self.workers <= 0:
+            return getattr(self.local_context, method_name)(*args, **kwargs)  # Pool disabled: hash inline
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            raise PasswordPoolSaturated()
+        try:
+            future = self._get_executor().submit(_run, method_name, args, kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
@@ -0,0 +1,253 @@
+"""Token-bucket rate limiting for expensive endpoints.
+
+Rules are configured per endpoint in RATELIMIT_RULES as comma-separated
+``scope:count/period`` entries, for example ``'ip:5/minute, ip:20/hour'``.
+Each entry is a bucket holding up to ``count`` tokens that refills at
+``count`` per ``period``. A request takes one token from every bucket of its
+endpoint, or none at all: when any bucket is empty it is refused with 429 and
+``Retry-After`` and the other buckets keep their tokens.
+
+Scopes:
+
+* ``ip``   - keyed by the client address. Behind a reverse proxy that is the
+  proxy's address, so every client would share one bucket: list the proxies
+  in RATELIMIT_TRUSTED_PROXIES and the client is taken from X-Forwarded-For
+  instead (the rightmost entry not itself a trusted proxy). The header is
+  ignored on requests that do not come from a trusted proxy, so clients
+  cannot pick their own key;
+* ``user`` - keyed by the logged-in user's session identifier, read from the
+  session cookie rather than the database; anonymous requests fall back to
+  their address.
+
+The check runs in the first ``before_request`` hook, so a refused request
+never reaches the database or the password hasher. Only RATELIMIT_METHODS
+(POST by default) are counted: rendering a form is cheap, submitting it is
+not.
+
+Backends:
+
+* ``memory`` - per-process buckets; limits multiply with the worker count.
+* ``sqlite`` - buckets in a SQLite file shared by every worker on the host.
+* ``none``   - rate limiting disabled.
+"""
+import ipaddress
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, session
+from werkzeug.exceptions import TooManyRequests
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+PRUNE_PROBABILITY = 0.01  # Chance that creating a bucket also deletes long-idle ones (sqlite backend)
+_RULE = re.compile(r'^(ip|user):(\d+)/(second|minute|hour|day)$')
+
+
+class Rule:
+    """One bucket definition: `capacity` tokens, refilled at `capacity` per `period` seconds."""
+
+    def __init__(self, scope, capacity, period):
+        self.scope = scope
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period  # Tokens per second
+
+    @classmethod
+    def parse(cls, text):
+        match = _RULE.match(text.strip())
+        if match is None:
+            raise ValueError(f'Invalid rate limit rule: {text!r} (expected e.g. "ip:5/minute")')
+        scope, count, period = match.groups()
+        return cls(scope, int(count), PERIODS[period])
+
+
+def parse_rules(spec):
+    return [Rule.parse(part) for part in spec.split(',') if part.strip()]
+
+
+def refill(tokens, updated_at, now, rule):
+    """Tokens in a bucket last written at `updated_at`, as of `now`."""
+    return min(rule.capacity, tokens + (now - updated_at) * rule.rate)
+
+
+def take_all(levels, buckets):
+    """Decide a request against every bucket at once.
+
+    `levels` are the refilled token counts of `buckets` (``(key, rule)`` pairs).
+    Return the seconds until all of them hold a token - 0 when they already
+    do - and the levels to store: one token less in each when the request is
+    allowed, unchanged when it is refused.
+    """
+    wait = max((1 - tokens) / rule.rate if tokens < 1 else 0.0 for tokens, (_, rule) in zip(levels, buckets))
+    return wait, levels if wait else [tokens - 1 for tokens in levels]
+
+
+class NullBackend:
+    """Backend used when rate limiting is disabled; every request is allowed."""
+
+    def take(self, buckets):
+        return 0.0
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryBackend:
+    """Buckets in this process, bounded to the `max_keys` most recently used."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        """Take a token from each of `buckets`; return 0 if all had one, else seconds until they will."""
+        now = time.monotonic()
+        with self._lock:
+            levels = [refill(*self._buckets.get(key, (rule.capacity, now)), now, rule) for key, rule in buckets]
+            wait, levels = take_all(levels, buckets)
+            for (key, _), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # A forgotten bucket is simply full again
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteBackend:
+    """Buckets in a SQLite file so that every worker process on the host shares them."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit ('
+            ' key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        # sqlite3 connections may not be shared across threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, buckets):
+        conn = self._connection()
+        now = time.time()  # Wall clock: comparable across processes
+        conn.execute('BEGIN IMMEDIATE')  # Serialize read-modify-write between workers
+        try:
+            rows = [conn.execute('SELECT tokens, updated_at FROM rate_limit WHERE key = ?', (key,)).fetchone()
+                    for key, _ in buckets]
+            levels = [refill(*row, now, rule) if row else rule.capacity for row, (_, rule) in zip(rows, buckets)]
+            wait, levels = take_all(levels, buckets)
+            conn.executemany('INSERT OR REPLACE INTO rate_limit (key, tokens, updated_at) VALUES (?, ?, ?)',
+                             [(key, tokens, now) for (key, _), tokens in zip(buckets, levels)])
+            if None in rows and random.random() < PRUNE_PROBABILITY:
+                # Buckets idle for a day are full under any rule; dropping them changes nothing
+                conn.execute('DELETE FROM rate_limit WHERE updated_at < ?', (now - PERIODS['day'],))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+    def clear(self):
+        self._connection().execute('DELETE FROM rate_limit')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM rate_limit').fetchone()[0]
+
+
+class RateLimiter:
+    """Flask extension checking the configured buckets before each request."""
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.rules = {}
+        self.stats = {'allowed': 0, 'limited': 0}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        backend = config.get('RATELIMIT_BACKEND', 'memory') if config.get('RATELIMIT_ENABLED', True) else 'none'
+        if backend == 'memory':
+            self.backend = MemoryBackend(max_keys=config.get('RATELIMIT_MAX_KEYS', 100000))
+        elif backend == 'sqlite':
+            path = os.path.join(app.instance_path, config.get('RATELIMIT_PATH', 'ratelimit.db'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(path)
+        elif backend == 'none':
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f'Unknown RATELIMIT_BACKEND: {backend!r}')
+        self.rules = {endpoint: parse_rules(spec) for endpoint, spec in config.get('RATELIMIT_RULES', {}).items()}
+        self.methods = frozenset(method.upper() for method in config.get('RATELIMIT_METHODS', ('POST',)))
+        self.trusted_proxies = tuple(ipaddress.ip_network(net, strict=False)
+                                     for net in config.get('RATELIMIT_TRUSTED_PROXIES', ()))
+        app.extensions['rate_limiter'] = self
+        if backend != 'none':
+            app.before_request(self.check)
+
+    def check(self):
+        rules = self.rules.get(request.endpoint)
+        if not rules or request.method not in self.methods:
+            return
+        client = self.client_address()
+        wait = self.backend.take([(self._key(request.endpoint, index, rule, client), rule)
+                                  for index, rule in enumerate(rules)])
+        with self._lock:
+            self.stats['limited' if wait else 'allowed'] += 1
+        if wait:
+            raise TooManyRequests(retry_after=math.ceil(wait))
+
+    def client_address(self):
+        """The client's address, read through X-Forwarded-For when the request comes from a trusted proxy."""
+        address = request.remote_addr
+        if not self.trusted_proxies or not self._trusted(address):
+            return address
+        hops = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+        for hop in reversed(hops):  # Each proxy appends the address it saw, so walk back from the nearest one
+            address = hop
+            if not self._trusted(hop):
+                break
+        return address
+
+    def _trusted(self, address):
+        try:
+            address = ipaddress.ip_address(address or '')
+        except ValueError:
+            return False  # A garbled hop ends the walk; it is the best address there is
+        return any(address in network for network in self.trusted_proxies)
+
+    @staticmethod
+    def _key(endpoint, index, rule, client):
+        identity = session.get('_user_id') if rule.scope == 'user' else None
+        if identity is None:
+            identity = f'ip:{client}'
+        else:
+            identity = f'user:{identity}'
+        return f'{endpoint}:{index}:{identity}'
+
+    def info(self):
+        return dict(self.stats, buckets=len(self.backend), backend=type(self.backend).__name__)
@@ -0,0 +1,125 @@
+"""Markdown post bodies, rendered and sanitized once at write time.
+
+``Blog.content`` holds the Markdown source; ``Blog.content_html`` holds the
+sanitized HTML the detail page shows and ``Blog.content_html_version`` the
+RENDERER_VERSION that produced it. Assigning ``content`` renders the HTML in
+the same flush (see ``models._update_summary``), so a request for a post does
+no parsing at all.
+
+Bump RENDERER_VERSION whenever the output of ``render_markdown`` changes
+(extensions, allowed tags, Markdown upgrades). Rows rendered by an older
+version are re-rendered lazily the next time they are shown
+(``ensure_html``), or all at once, in parallel, with ``flask blog render``.
+The version is also part of ``post_version``, so cached and frozen copies of
+every post go stale with it.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import markdown
+import nh3
+from markupsafe import Markup
+from sqlalchemy import bindparam
+from sqlalchemy.orm.attributes import set_committed_value
+
+RENDERER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'sane_lists', 'nl2br']  # nl2br: plain-text posts keep their line breaks
+ALLOWED_TAGS = {
+    'a', 'abbr', 'blockquote', 'br', 'code', 'del', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'img',
+    'li', 'ol', 'p', 'pre', 'strong', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'code': {'class'},  # language-* from fenced code blocks
+    'img': {'src', 'alt', 'title'},
+    'td': {'align'},
+    'th': {'align'},
+}
+URL_SCHEMES = {'http', 'https', 'mailto'}
+
+_local = threading.local()
+
+
+def render_markdown(source):
+    """Markdown source to sanitized HTML: raw HTML and unsafe URLs in the source are stripped."""
+    converter = getattr(_local, 'markdown', None)
+    if converter is None:
+        converter = _local.markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    html = converter.reset().convert(source or '')
+    return nh3.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES, url_schemes=URL_SCHEMES,
+                     link_rel='nofollow noopener noreferrer')
+
+
+def plain_text(html, length=None):
+    """Text of rendered `html` with tags dropped, entities decoded and whitespace collapsed.
+
+    With `length`, longer text is cut at the last word boundary before it and ends in an ellipsis.
+    """
+    text = Markup(html or '').striptags()
+    if length is not None and len(text) > length:
+        text = text[:length].rsplit(' ', 1)[0].rstrip() + '\u2026'
+    return text
+
+
+def post_version(updated_at):
+    """Version string that page caches and snapshots store a rendered post under."""
+    return f'{updated_at.isoformat()}|r{RENDERER_VERSION}'
+
+
+def _store_html(db, Blog, rows):
+    """Write [{'blog_id', 'html'}, ...] without touching updated_at or firing the ORM update events."""
+    table = Blog.__table__
+    stmt = (
+        table.update()
+        .where(table.c.id == bindparam('blog_id'))
+        .values(content_html=bindparam('html'), content_html_version=RENDERER_VERSION,
+                updated_at=table.c.updated_at)  # Keep the column's onupdate from firing
+    )
+    with db.engine.begin() as conn:
+        conn.execute(stmt, rows)
+
+
+def html_is_current(blog):
+    return blog.content_html_version == RENDERER_VERSION and blog.content_html is not None
+
+
+def ensure_html(db, Blog, blog):
+    """Re-render `blog` if its stored HTML predates RENDERER_VERSION; return its HTML.
+
+    The write goes through its own connection, so the caller's session (and
+    the loaded `blog`) is neither flushed nor expired.
+    """
+    if html_is_current(blog):
+        return blog.content_html
+    html = render_markdown(blog.content)
+    _store_html(db, Blog, [{'blog_id': blog.id, 'html': html}])
+    set_committed_value(blog, 'content_html', html)
+    set_committed_value(blog, 'content_html_version', RENDERER_VERSION)
+    return html
+
+
+def render_stale(db, Blog, workers=None, batch_size=500, rerender_all=False):
+    """Re-render every post not rendered by RENDERER_VERSION on a process pool; return how many were."""
+    query = db.select(Blog.id, Blog.content).order_by(Blog.id).limit(batch_size)
+    if not rerender_all:
+        query = query.where((Blog.content_html_version != RENDERER_VERSION) | Blog.content_html.is_(None))
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, batch_size // (4 * workers))  # A few chunks per worker per batch
+    done, last_id = 0, 0
+    # spawn: workers import only this module, not a copy of the app and its open connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        while True:
+            batch = db.session.execute(query.where(Blog.id > last_id)).all()
+            db.session.rollback()  # Don't hold a read transaction open while the pool works
+            if not batch:
+                break
+            ids, sources = zip(*batch)
+            html = pool.map(render_markdown, sources, chunksize=chunksize)
+            _store_html(db, Blog, [{'blog_id': blog_id, 'html': body} for blog_id, body in zip(ids, html)])
+            done += len(batch)
+            last_id = ids[-1]
+    return done
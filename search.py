@@ -0,0 +1,119 @@
+"""Full-text search over posts using a SQLite FTS5 external-content table.
+
+``blog_fts`` indexes ``blog.title`` and ``blog.content`` without storing a
+second copy of the text. Triggers on ``blog`` keep the index current on
+insert, update and delete, so every write path (ORM, bulk import, raw SQL)
+is covered. Results are ranked with bm25, title matches weighted higher.
+"""
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, DateTime, Integer, String, event, text
+from sqlalchemy.exc import OperationalError
+
+# Statements creating the index and its sync triggers; also run by the migration that introduced them
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_fts USING fts5("
+    "title, content, content='blog', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_ai AFTER INSERT ON blog BEGIN "
+    "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_ad AFTER DELETE ON blog BEGIN "
+    "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    # Only reindex when the searchable columns change, not on every summary/version update
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_au AFTER UPDATE OF title, content ON blog BEGIN "
+    "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+TITLE_WEIGHT, CONTENT_WEIGHT = 10.0, 1.0
+SNIPPET_TOKENS = 24
+# Control characters cannot appear in escaped HTML, so they mark highlights safely until escaping is done
+_HIGHLIGHT_START, _HIGHLIGHT_END = '\x02', '\x03'
+
+SEARCH_SQL = text(
+    "SELECT blog.id, blog.title, blog.date_posted,"
+    f" snippet(blog_fts, 1, char(2), char(3), '…', {SNIPPET_TOKENS}) AS snippet"
+    " FROM blog_fts JOIN blog ON blog.id = blog_fts.rowid"
+    " WHERE blog_fts MATCH :match"
+    f" ORDER BY bm25(blog_fts, {TITLE_WEIGHT}, {CONTENT_WEIGHT}), blog.id DESC"
+    " LIMIT :limit OFFSET :offset"
+).columns(id=Integer, title=String, date_posted=DateTime, snippet=String)
+
+
+class SearchResult:
+    def __init__(self, id, title, date_posted, snippet):
+        self.id = id
+        self.title = title
+        self.date_posted = date_posted
+        self.snippet = snippet
+
+
+def fts_available(db):
+    return db.engine.dialect.name == 'sqlite'
+
+
+def install_fts(connection):
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+
+
+def build_match_query(user_query):
+    """Turn free text into an FTS5 expression of quoted terms, so user input is never parsed as syntax.
+
+    Terms are ANDed together and the last one is matched as a prefix to
+    support search-as-you-type.
+    """
+    terms = [term.replace('"', '""') for term in user_query.split()]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def highlight(snippet):
+    """Escape a raw snippet and turn the FTS highlight markers into <mark> tags."""
+    escaped = str(escape(snippet or ''))
+    return Markup(escaped.replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>'))
+
+
+def search_posts(db, user_query, page=1, per_page=20):
+    """Return (results, has_next) for one page of bm25-ranked matches."""
+    match = build_match_query(user_query)
+    if match is None:
+        return [], False
+    try:
+        rows = db.session.execute(
+            SEARCH_SQL, {'match': match, 'limit': per_page + 1, 'offset': (page - 1) * per_page}
+        ).all()
+    except OperationalError as error:
+        # Quoting keeps user input out of the FTS5 grammar; should a query still be rejected, it matches nothing
+        db.session.rollback()
+        current_app.logger.warning('Search query %r failed: %s', user_query, error.orig)
+        return [], False
+    results = [SearchResult(row.id, row.title, row.date_posted, highlight(row.snippet)) for row in rows[:per_page]]
+    return results, len(rows) > per_page
+
+
+def register_fts_ddl(table):
+    """Create the index alongside the blog table when it is built with db.create_all() on SQLite."""
+    for statement in FTS_DDL:
+        event.listen(table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+
+search_cli = AppGroup('search', help='Maintain the full-text search index.')
+
+
+@search_cli.command('rebuild')
+@with_appcontext
+def rebuild_command():
+    """Rebuild blog_fts from the blog table (use after restoring or hand-editing data)."""
+    db = current_app.extensions['sqlalchemy']
+    if not fts_available(db):
+        raise click.ClickException('Full-text search requires a SQLite database.')
+    with db.engine.begin() as connection:
+        install_fts(connection)
+        connection.execute(text("INSERT INTO blog_fts(blog_fts) VALUES ('rebuild')"))
+        connection.execute(text("INSERT INTO blog_fts(blog_fts) VALUES ('optimize')"))
+    click.echo('Search index rebuilt.')
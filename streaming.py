@@ -0,0 +1,79 @@
+"""Streamed template rendering for long pages.
+
+``render_template`` builds the whole page in memory before the first byte
+leaves the worker. ``stream_page`` instead renders through Jinja's
+``generate`` path, so a view can hand the template a lazily iterated query
+(see ``pagination.keyset_stream``) and rows go out while later ones are still
+being fetched.
+
+Jinja yields many tiny pieces, so output is coalesced into chunks of
+STREAM_BUFFER_SIZE bytes. ``base.html`` calls ``{{ stream_flush() }}`` just
+before the content block: everything up to that point - the head, styles and
+navbar - is sent before the view's query runs, which lets the browser start
+fetching stylesheets straight away.
+
+The body is generated after the view has returned. ``stream_with_context``
+keeps the request and app contexts pushed until the last chunk, so
+``request``, ``g`` and ``url_for`` work throughout, but the teardown handlers
+have already run once when the view returned (and run again at the end of
+the stream). Flask-SQLAlchemy has removed the view's database session by
+then, and the session cookie has been written. So:
+
+* rows must be queried lazily against the session current at iteration time
+  (``keyset_stream(..., session=db.session)``); instances the view loaded
+  are detached by then and can only use attributes that are already loaded;
+* streamed templates must not change the session. Pending flash messages are
+  popped up front for that reason.
+
+With TEMPLATE_STREAMING off ``stream_page`` falls back to an ordinary buffered
+render.
+"""
+from flask import current_app, g, get_flashed_messages, render_template, stream_template, stream_with_context
+
+
+def request_flush():
+    """Ask ``stream_page`` to send what it has buffered as soon as the current piece is rendered."""
+    g.stream_flush = True
+    return ''
+
+
+def init_streaming(app):
+    app.jinja_env.globals['stream_flush'] = request_flush
+
+
+def _coalesce(pieces, buffer_size, on_complete=None):
+    buffered, size, sent = [], 0, []
+    for piece in pieces:
+        buffered.append(piece)
+        size += len(piece)
+        if size >= buffer_size or g.pop('stream_flush', False):
+            chunk = ''.join(buffered)
+            if on_complete is not None:
+                sent.append(chunk)
+            yield chunk
+            buffered, size = [], 0
+    chunk = ''.join(buffered)
+    if on_complete is not None:
+        on_complete(''.join(sent) + chunk)
+    if chunk:
+        yield chunk
+
+
+def stream_page(template_name, on_complete=None, **context):
+    """Render `template_name` as a streamed response (or a string when streaming is disabled).
+
+    `on_complete(html)` is called with the full page once it has rendered
+    completely, for example to fill a page cache.
+    """
+    config = current_app.config
+    if not config.get('TEMPLATE_STREAMING', True):
+        html = render_template(template_name, **context)
+        if on_complete is not None:
+            on_complete(html)
+        return html
+    get_flashed_messages()  # Pop flashes into the request now, while the session can still be saved
+    g.pop('stream_flush', None)
+    pieces = stream_template(template_name, **context)
+    # The request context stays pushed until the last chunk, so on_complete can use it too
+    body = stream_with_context(_coalesce(pieces, config.get('STREAM_BUFFER_SIZE', 8192), on_complete))
+    return current_app.response_class(body, mimetype='text/html')
@@ -0,0 +1,87 @@
+"""Jinja bytecode caching, start-up precompilation and cold-start timing.
+
+A fresh worker normally parses and compiles ``base.html`` and each child
+template the first time a request needs it. ``TemplateCache``:
+
+* stores compiled template bytecode under ``instance/<TEMPLATE_CACHE_DIR>`` so
+  every worker on the host (and every restart) skips the parse/compile step;
+* with TEMPLATE_PRECOMPILE, loads every template the app's loaders can find
+  (pages, feeds, e-mails) at start-up instead of on the first request that
+  needs it (``flask templates compile`` does the same at build time, to warm
+  the cache before workers start); apps created by the ``flask`` CLI skip it;
+* sets Jinja's ``auto_reload`` from TEMPLATES_AUTO_RELOAD, or from debug mode
+  when that is unset, so production renders no longer stat the template files
+  on every ``get_template``;
+* records how long precompilation took and the time from app start to the
+  first successful response, exposed through ``info()``.
+"""
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache
+
+
+class TemplateCache:
+
+    def __init__(self, app=None):
+        self.stats = {'templates': 0, 'precompile_seconds': 0.0, 'first_response_seconds': None}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.started = time.perf_counter()
+        app.extensions['template_cache'] = self
+        env = app.jinja_env
+        auto_reload = app.config.get('TEMPLATES_AUTO_RELOAD')
+        env.auto_reload = app.debug if auto_reload is None else auto_reload  # Flask's own rule for None
+        if app.config.get('TEMPLATE_BYTECODE_CACHE', 'filesystem') == 'filesystem':
+            directory = os.path.join(app.instance_path, app.config.get('TEMPLATE_CACHE_DIR', 'jinja_cache'))
+            os.makedirs(directory, exist_ok=True)
+            env.bytecode_cache = FileSystemBytecodeCache(directory)
+        if app.config.get('TEMPLATE_PRECOMPILE') and click.get_current_context(silent=True) is None:
+            self.precompile(app)  # Not for `flask db upgrade` and other CLI commands, which render nothing
+
+        @app.after_request
+        def _record_first_response(response):
+            if self.stats['first_response_seconds'] is None and response.status_code < 400:
+                self.stats['first_response_seconds'] = round(time.perf_counter() - self.started, 4)
+                app.logger.info('First successful response %.1f ms after start-up',
+                                self.stats['first_response_seconds'] * 1000)
+            return response
+
+    def precompile(self, app):
+        """Load every template so parsing happens now rather than on a user's request."""
+        started = time.perf_counter()
+        env = app.jinja_env
+        names = env.list_templates()  # Every loader's templates: .html pages, .xml feeds, .txt e-mails
+        for name in names:
+            env.get_template(name)
+        self.stats['templates'] = len(names)
+        self.stats['precompile_seconds'] = round(time.perf_counter() - started, 4)
+        return names
+
+    def info(self):
+        return dict(self.stats)
+
+
+templates_cli = AppGroup('templates', help='Template cache maintenance.')
+
+
+@templates_cli.command('compile')
+def compile_command():
+    """Compile every template into the bytecode cache."""
+    cache = current_app.extensions['template_cache']
+    names = cache.precompile(current_app)
+    click.echo(f"Compiled {len(names)} templates in {cache.stats['precompile_seconds'] * 1000:.1f} ms.")
+
+
+@templates_cli.command('clear')
+def clear_command():
+    """Empty the bytecode cache (it is also invalidated automatically when a template changes)."""
+    bytecode_cache = current_app.jinja_env.bytecode_cache
+    if bytecode_cache is not None:
+        bytecode_cache.clear()
+    click.echo('Template bytecode cache cleared.')
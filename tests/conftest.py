@@ -0,0 +1,82 @@
+"""Shared fixtures: a fresh app on a throw-away SQLite database, migrated to head."""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)  # The app modules live at the top level of the repository
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+from extensions import db  # noqa: E402
+
+PASSWORD = 'correct horse battery'
+
+
+@pytest.fixture
+def config_overrides():
+    """Extra settings for the app under test; override this fixture in a test module to change them."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, config_overrides):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'blog.db'}"
+        SQLALCHEMY_ENGINE_OPTIONS = {}
+        DATABASE_REPLICA_URIS = []
+        WTF_CSRF_ENABLED = False
+        JOBS_MODE = 'inline'  # Jobs run after the request that queued them
+        PASSWORD_POOL_WORKERS = 0  # Hash inline rather than in worker processes
+        SECURITY_PASSWORD_HASH_PASSLIB_OPTIONS = {'bcrypt__default_rounds': 4, 'bcrypt__min_rounds': 4}
+        PAGE_CACHE_BACKEND = 'memory'
+        RATELIMIT_BACKEND = 'memory'
+        TEMPLATE_BYTECODE_CACHE = 'none'
+        TEMPLATE_PRECOMPILE = False
+        FREEZE_SERVE = False
+        FREEZE_DIR = str(tmp_path / 'snapshots')
+        FEEDS_DIR = str(tmp_path / 'feeds')
+        FEEDS_BASE_URL = 'https://blog.example.com'
+        PROFILE_DIR = str(tmp_path / 'profiles')
+        MAIL_SERVER = None  # Notifications are logged
+
+    for key, value in config_overrides.items():
+        setattr(TestConfig, key, value)
+    app = create_app(TestConfig)
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, 'migrations'))
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def member(client):
+    """`client`, signed up and logged in as member@example.com."""
+    client.post('/register', data={'email': 'member@example.com', 'password': PASSWORD, 'confirm_password': PASSWORD})
+    client.post('/login', data={'email': 'member@example.com', 'password': PASSWORD})
+    return client
+
+
+@pytest.fixture
+def publish(member):
+    """Post as the member; returns the new post's id. Pending flashes are consumed so pages stay cacheable."""
+    def publish(title='A post', content='Some **Markdown** text.', tags=''):
+        response = member.post('/blog/new', data={'title': title, 'content': content, 'tags': tags})
+        assert response.status_code == 302
+        member.get('/about')
+        with member.application.app_context():
+            from models import Blog
+            return db.session.scalar(db.select(db.func.max(Blog.id)))
+    return publish
@@ -0,0 +1,30 @@
+"""Import-time budget for ``app``, the cost every worker and CLI invocation pays.
+
+``python -m benchmarks.coldstart`` gives the full breakdown; this keeps CI from
+letting ``import app`` creep up. Override the budget with COLDSTART_MAX_IMPORT_MS.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_IMPORT_MS = float(os.environ.get('COLDSTART_MAX_IMPORT_MS', 3000))
+RUNS = 3
+
+CHILD = """
+import time
+started = time.perf_counter()
+import app
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+def time_import():
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def test_import_app_within_budget():
+    best = min(time_import() for _ in range(RUNS))  # Fastest run: least disturbed by other CI load
+    assert best <= MAX_IMPORT_MS, f'import app took {best:.1f} ms, budget {MAX_IMPORT_MS:.1f} ms'
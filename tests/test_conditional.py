@@ -0,0 +1,64 @@
+import time
+
+from extensions import db
+from models import Blog
+
+
+def test_post_page_answers_if_none_match_with_304(member, publish):
+    blog_id = publish()
+    response = member.get(f'/blog/{blog_id}', buffered=True)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    revalidated = member.get(f'/blog/{blog_id}', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+
+
+def test_post_page_answers_if_modified_since_with_304(member, publish):
+    blog_id = publish()
+    response = member.get(f'/blog/{blog_id}', buffered=True)
+    last_modified = response.headers['Last-Modified']
+    assert member.get(f'/blog/{blog_id}', headers={'If-Modified-Since': last_modified}).status_code == 304
+    stale = member.get(f'/blog/{blog_id}', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})
+    assert stale.status_code == 200
+
+
+def test_editing_a_post_changes_its_etag(app, member, publish):
+    blog_id = publish()
+    response = member.get(f'/blog/{blog_id}', buffered=True)
+    etag = response.headers['ETag']
+    time.sleep(0.01)
+    with app.app_context():
+        db.session.get(Blog, blog_id).content = 'Edited'
+        db.session.commit()
+    response = member.get(f'/blog/{blog_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Edited' in response.data
+    assert response.headers['ETag'] != etag
+
+
+def test_dashboard_etag_follows_new_posts(member, publish):
+    publish(title='First')
+    response = member.get('/dashboard', buffered=True)
+    etag = response.headers['ETag']
+    assert member.get('/dashboard', headers={'If-None-Match': etag}).status_code == 304
+
+    publish(title='Second')
+    response = member.get('/dashboard', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Second' in response.data
+
+
+def test_static_pages_are_conditional(client):
+    etag = client.get('/about').headers['ETag']
+    assert client.get('/about', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_no_304_while_a_flash_is_pending(member, publish):
+    blog_id = publish()
+    response = member.get(f'/blog/{blog_id}', buffered=True)
+    etag = response.headers['ETag']
+    member.post('/blog/new', data={'title': 'Another', 'content': 'x'})  # Leaves a flash pending
+    assert member.get(f'/blog/{blog_id}', headers={'If-None-Match': etag}).status_code == 200
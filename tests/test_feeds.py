@@ -0,0 +1,29 @@
+import json
+import os
+
+
+def test_no_build_from_the_request_host(app, client):
+    app.extensions['feeds'].base_url = None  # Neither FEEDS_BASE_URL nor SERVER_NAME
+    response = client.get('/sitemap.xml', headers={'Host': 'evil.example'})
+    assert response.status_code == 404
+    assert not os.path.exists(os.path.join(app.extensions['feeds'].directory, 'manifest.json'))
+
+
+def test_sitemap_uses_the_configured_base_url(client):
+    body = client.get('/sitemap.xml', headers={'Host': 'evil.example'}).data
+    assert b'https://blog.example.com/' in body
+    assert b'evil.example' not in body
+
+
+def test_feeds_carry_plain_text_summaries(member, publish):
+    publish(title='Formatted', content='Some **bold** text & a [link](https://example.com).\n\n* item')
+    atom = member.get('/feed.atom').text
+    assert '<summary>Some bold text &amp; a link. item</summary>' in atom
+    feed = json.loads(member.get('/feed.json').data)
+    assert feed['items'][0]['content_text'] == 'Some bold text & a link. item'
+    assert feed['items'][0]['url'].startswith('https://blog.example.com/blog/')
+
+
+def test_feed_links_only_for_members(app, member):
+    assert b'feed.atom' in member.get('/about').data
+    assert b'feed.atom' not in app.test_client().get('/about').data
@@ -0,0 +1,41 @@
+from sqlalchemy import inspect
+
+from extensions import db
+from identity import CachingUserDatastore
+from models import Role, User
+
+
+def datastore(app):
+    return app.extensions['security'].datastore
+
+
+def test_listeners_are_registered_once(app):
+    listeners = len(inspect(User).dispatch.after_update)
+    CachingUserDatastore(db, User, Role)
+    CachingUserDatastore(db, User, Role)
+    assert len(inspect(User).dispatch.after_update) == listeners
+
+
+def test_changes_evict_on_commit_not_on_flush(app, member):
+    with app.app_context():
+        user = db.session.scalar(db.select(User))
+        uniquifier = user.fs_uniquifier
+        datastore(app).find_user(fs_uniquifier=uniquifier)
+        assert datastore(app)._cache.get(uniquifier) is not None
+
+        user = db.session.get(User, user.id)
+        user.active = False
+        db.session.flush()
+        assert datastore(app)._cache.get(uniquifier) is not None  # Another request could still re-cache the old row
+        db.session.commit()
+        assert datastore(app)._cache.get(uniquifier) is None
+
+
+def test_rolled_back_changes_keep_the_entry(app, member):
+    with app.app_context():
+        user = db.session.scalar(db.select(User))
+        datastore(app).find_user(fs_uniquifier=user.fs_uniquifier)
+        user.roles.append(Role(name='editor'))
+        db.session.flush()
+        db.session.rollback()
+        assert datastore(app)._cache.get(user.fs_uniquifier) is not None
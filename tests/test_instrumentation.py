@@ -0,0 +1,35 @@
+import logging
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+
+
+@pytest.fixture
+def config_overrides():
+    return {'INSTRUMENTATION_ENABLED': True, 'TEMPLATE_STREAMING': True}
+
+
+def metric_lines(client, name):
+    return [line for line in client.get('/metrics').text.splitlines() if line.startswith(name + '{')]
+
+
+def test_streamed_page_phases_are_recorded_at_close(member, publish, caplog):
+    publish()
+    with caplog.at_level(logging.INFO, logger='instrumentation'):
+        response = member.get('/dashboard', buffered=True)
+    assert 'Server-Timing' in response.headers
+    assert any(line.startswith('GET /dashboard 200: ') for line in caplog.messages)
+    # Template rendering happens while the body streams, after the headers have gone
+    tpl = [line for line in metric_lines(member, 'request_phase_seconds_total')
+           if 'endpoint="main.dashboard"' in line and 'phase="tpl"' in line]
+    assert tpl and float(tpl[0].rsplit(' ', 1)[1]) > 0
+
+
+def test_failed_statements_leave_no_start_time_behind(app):
+    with app.app_context():
+        with pytest.raises(OperationalError):
+            db.session.execute(text('SELECT * FROM no_such_table'))
+        assert db.session.connection().info.get('query_started') == {}
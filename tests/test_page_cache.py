@@ -0,0 +1,48 @@
+from extensions import db, page_cache
+from models import Blog
+
+
+def counters():
+    info = page_cache.info()
+    return info['hits'], info['misses']
+
+
+def test_second_view_is_a_cache_hit(member, publish):
+    blog_id = publish(title='Cached')
+    hits, misses = counters()
+    first = member.get(f'/blog/{blog_id}', buffered=True).data
+    second = member.get(f'/blog/{blog_id}', buffered=True).data
+    assert b'Cached' in first
+    assert first == second
+    assert counters() == (hits + 1, misses + 1)
+
+
+def test_editing_a_post_invalidates_its_page(app, member, publish):
+    blog_id = publish(title='Before', content='Old body')
+    assert b'Old body' in member.get(f'/blog/{blog_id}').data
+    with app.app_context():
+        blog = db.session.get(Blog, blog_id)
+        blog.title, blog.content = 'After', 'New body'
+        db.session.commit()
+    body = member.get(f'/blog/{blog_id}').data
+    assert b'New body' in body and b'Old body' not in body
+    assert b'After' in body
+
+
+def test_deleting_a_post_drops_its_page(app, member, publish):
+    blog_id = publish()
+    member.get(f'/blog/{blog_id}')
+    with app.app_context():
+        db.session.delete(db.session.get(Blog, blog_id))
+        db.session.commit()
+    assert member.get(f'/blog/{blog_id}').status_code == 404
+
+
+def test_pages_with_flashes_are_not_cached(member, publish):
+    blog_id = publish()
+    member.post('/blog/new', data={'title': 'Another', 'content': 'x'})  # Leaves a flash pending
+    size = page_cache.info()['size']
+    response = member.get(f'/blog/{blog_id}')
+    assert b'Your blog post has been created!' in response.data
+    assert page_cache.info()['size'] == size
+    assert 'ETag' not in response.headers
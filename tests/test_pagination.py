@@ -0,0 +1,67 @@
+import html
+import re
+from datetime import datetime
+
+import pytest
+
+from pagination import clamp_page_size, decode_cursor, encode_cursor
+
+
+def post_ids(body):
+    return [int(post_id) for post_id in re.findall(rb'href="/blog/(\d+)"', body)]
+
+
+def next_link(body):
+    match = re.search(rb'href="([^"]*after=[^"]*)"', body)
+    return html.unescape(match.group(1).decode()) if match else None
+
+
+def test_cursor_round_trip():
+    posted = datetime(2024, 5, 1, 12, 30, 15, 250)
+    assert decode_cursor(encode_cursor(posted, 42)) == (posted, 42)
+
+
+@pytest.mark.parametrize('cursor', ['', 'nonsense', '2024-05-01T12:00:00', 'not-a-date_3', '2024-05-01T12:00:00_x'])
+def test_decode_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_clamp_page_size():
+    assert clamp_page_size(None, 10, 50) == 10
+    assert clamp_page_size('abc', 10, 50) == 10
+    assert clamp_page_size('0', 10, 50) == 1
+    assert clamp_page_size('500', 10, 50) == 50
+
+
+def test_dashboard_pages_follow_the_cursor(app, member, publish):
+    app.config['BLOG_PAGE_SIZE'] = 3
+    ids = [publish(title=f'Post {n}') for n in range(7)]
+
+    seen, url = [], '/dashboard'
+    while url:
+        body = member.get(url).data
+        page = post_ids(body)
+        assert len(page) <= 3
+        seen += page
+        url = next_link(body)
+    assert seen == ids[::-1]  # Newest first, every post exactly once
+
+
+def test_last_page_has_no_next_link(app, member, publish):
+    app.config['BLOG_PAGE_SIZE'] = 3
+    for n in range(3):
+        publish(title=f'Post {n}')
+    assert next_link(member.get('/dashboard').data) is None
+
+
+def test_bad_cursor_is_a_400(member, publish):
+    publish()
+    assert member.get('/dashboard?after=garbage').status_code == 400
+
+
+def test_per_page_is_capped(app, member, publish):
+    app.config['BLOG_MAX_PAGE_SIZE'] = 2
+    for n in range(3):
+        publish(title=f'Post {n}')
+    assert len(post_ids(member.get('/dashboard?per_page=100').data)) == 2
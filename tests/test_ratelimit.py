@@ -0,0 +1,53 @@
+import pytest
+
+from ratelimit import MemoryBackend, Rule
+
+PROXY = {'REMOTE_ADDR': '10.0.0.1'}
+
+
+@pytest.fixture
+def config_overrides():
+    return {
+        'RATELIMIT_RULES': {'main.subscribe': 'ip:2/minute'},
+        'RATELIMIT_METHODS': ['post'],  # Matched case-insensitively
+        'RATELIMIT_TRUSTED_PROXIES': ['10.0.0.0/8'],
+    }
+
+
+def subscribe(client, forwarded_for=None, environ=()):
+    headers = {'X-Forwarded-For': forwarded_for} if forwarded_for else {}
+    return client.post('/subscribe', data={'email': 'reader@example.com'}, headers=headers, environ_base=dict(environ))
+
+
+def test_refused_with_429_and_retry_after(client):
+    assert [subscribe(client).status_code for _ in range(2)] == [302, 302]
+    response = subscribe(client)
+    assert response.status_code == 429
+    assert 0 < int(response.headers['Retry-After']) <= 60
+    assert client.get('/subscribe').status_code == 200  # Only POST is counted
+
+
+def test_forwarded_for_is_ignored_from_untrusted_addresses(client):
+    # 127.0.0.1 is no proxy, so whatever it claims to forward for, it shares one bucket
+    statuses = [subscribe(client, forwarded_for=f'192.0.2.{n}').status_code for n in range(3)]
+    assert statuses == [302, 302, 429]
+
+
+def test_forwarded_for_names_the_client_behind_a_trusted_proxy(client):
+    for n in range(3):
+        assert subscribe(client, forwarded_for=f'192.0.2.{n}', environ=PROXY).status_code == 302
+    # The rightmost hop that is not a trusted proxy is the client; anything left of it is the client's say-so
+    statuses = [subscribe(client, forwarded_for=f'203.0.113.{n}, 192.0.2.9, 10.0.0.2', environ=PROXY).status_code
+                for n in range(3)]
+    assert statuses == [302, 302, 429]
+
+
+def test_a_refusal_spends_no_tokens():
+    backend = MemoryBackend()
+    small, large = ('small', Rule('ip', 1, 60)), ('large', Rule('ip', 3, 60))
+    assert backend.take([small, large]) == 0
+    assert backend.take([small, large]) > 0  # small is empty...
+    # ...and large still holds the two tokens the refused request did not take
+    assert backend.take([large]) == 0
+    assert backend.take([large]) == 0
+    assert backend.take([large]) > 0
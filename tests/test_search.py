@@ -0,0 +1,68 @@
+import re
+
+import pytest
+
+from extensions import db
+from models import Blog
+from search import build_match_query, highlight
+
+
+def result_titles(body):
+    return re.findall(rb'href="/blog/\d+">([^<]*)</a></h2>', body)
+
+
+def test_match_query_quotes_every_term():
+    assert build_match_query('flask  "sql" AND') == '"flask" """sql""" "AND"*'
+    assert build_match_query('   ') is None
+
+
+def test_highlight_escapes_the_snippet():
+    assert highlight('<b>\x02hit\x03</b>') == '&lt;b&gt;<mark>hit</mark>&lt;/b&gt;'
+
+
+def test_search_ranks_title_matches_first(member, publish):
+    publish(title='Gardening notes', content='Mostly about tomatoes and a little about python snakes.')
+    publish(title='Python packaging', content='Wheels and source distributions.')
+    publish(title='Unrelated', content='Nothing to see here.')
+    body = member.get('/search?q=python').data
+    assert result_titles(body) == [b'Python packaging', b'Gardening notes']
+    assert b'<mark>python</mark>' in body
+
+
+def test_last_term_matches_as_a_prefix(member, publish):
+    publish(title='Databases', content='Indexing strategies for SQLite.')
+    assert result_titles(member.get('/search?q=index').data) == [b'Databases']
+
+
+def test_index_follows_edits_and_deletes(app, member, publish):
+    blog_id = publish(title='Draft', content='alpha')
+    with app.app_context():
+        db.session.get(Blog, blog_id).content = 'omega'
+        db.session.commit()
+    assert result_titles(member.get('/search?q=alpha').data) == []
+    assert result_titles(member.get('/search?q=omega').data) == [b'Draft']
+    with app.app_context():
+        db.session.delete(db.session.get(Blog, blog_id))
+        db.session.commit()
+    assert result_titles(member.get('/search?q=omega').data) == []
+
+
+@pytest.mark.parametrize('query', ['"', 'foo"', 'AND', 'NEAR(', '*', 'title:', '^', '(a OR b', '-', '""""'])
+def test_malformed_queries_match_nothing(member, publish, query):
+    publish(title='Something', content='Text that never contains the query.')
+    response = member.get('/search', query_string={'q': query})
+    assert response.status_code == 200
+    assert result_titles(response.data) == []
+
+
+def test_search_requires_login(client):
+    assert client.get('/search?q=x').status_code == 302
+
+
+def test_a_query_fts5_rejects_matches_nothing(app, publish, monkeypatch):
+    import search
+    publish(title='Something', content='Anything.')
+    monkeypatch.setattr(search, 'build_match_query', lambda user_query: '"unterminated')  # Not valid FTS5
+    with app.test_request_context():
+        assert search.search_posts(db, 'unterminated') == ([], False)
+        assert db.session.scalar(db.select(db.func.count(Blog.id))) == 1  # The session is usable afterwards
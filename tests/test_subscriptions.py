@@ -0,0 +1,92 @@
+import re
+
+import pytest
+
+import notifications
+from extensions import db
+from models import Subscriber
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    sent = []
+    monkeypatch.setattr(notifications, 'send_mail',
+                        lambda recipient, subject, body, headers=None: sent.append((recipient, subject, body, headers)))
+    return sent
+
+
+def link(body, path):
+    return re.search(rf'https://blog\.example\.com({path}/\S+)', body).group(1)
+
+
+def subscribers(app):
+    with app.app_context():
+        return {s.email: s.confirmed for s in db.session.scalars(db.select(Subscriber))}
+
+
+def test_subscribing_needs_confirmation(app, client, outbox):
+    client.post('/subscribe', data={'email': 'reader@example.com'})
+    assert subscribers(app) == {'reader@example.com': False}
+    [(recipient, subject, body, _)] = outbox
+    assert recipient == 'reader@example.com' and subject == 'Confirm your subscription'
+
+    client.get(link(body, '/subscribe/confirm'))
+    assert subscribers(app) == {'reader@example.com': True}
+
+
+def test_bad_or_expired_confirmation_is_refused(app, client, outbox):
+    client.post('/subscribe', data={'email': 'reader@example.com'})
+    confirm = link(outbox[0][2], '/subscribe/confirm')
+    client.get(confirm[:-2] + 'xx')
+    app.config['SUBSCRIBE_CONFIRM_MAX_AGE'] = -1
+    client.get(confirm)
+    assert subscribers(app) == {'reader@example.com': False}
+
+
+def test_repeated_subscribe_mails_once(client, outbox):
+    for _ in range(3):
+        client.post('/subscribe', data={'email': 'victim@example.com'})
+    assert len(outbox) == 1
+
+
+def test_only_confirmed_subscribers_are_notified(app, client, publish, outbox):
+    client.post('/subscribe', data={'email': 'reader@example.com'})
+    client.get(link(outbox[0][2], '/subscribe/confirm'))
+    client.post('/subscribe', data={'email': 'unconfirmed@example.com'})
+    outbox.clear()
+
+    publish(title='Members only', content='Secret **content**.')
+    [(recipient, subject, body, headers)] = outbox
+    assert recipient == 'reader@example.com'
+    assert subject == 'New post: Members only'
+    assert 'Secret' not in body  # Not a member, so title and link only
+    assert headers['List-Unsubscribe-Post'] == 'List-Unsubscribe=One-Click'
+    assert headers['List-Unsubscribe'] == f"<https://blog.example.com{link(body, '/unsubscribe')}>"
+
+
+def test_members_get_the_excerpt(app, member, publish, outbox):
+    with app.app_context():
+        db.session.add(Subscriber(email='member@example.com', confirmed=True))
+        db.session.commit()
+    publish(title='Members only', content='Secret content.')
+    assert 'Secret content.' in outbox[0][2]
+
+
+def test_one_click_unsubscribe(app, client, outbox):
+    client.post('/subscribe', data={'email': 'reader@example.com'})
+    unsubscribe = link(outbox[0][2], '/unsubscribe')
+    assert client.get(unsubscribe).status_code == 200  # Asks first; link scanners only GET
+    assert subscribers(app) == {'reader@example.com': False}
+    client.post(unsubscribe)
+    assert subscribers(app) == {}
+    assert client.post(unsubscribe[:-2] + 'xx').status_code == 404
+
+
+def test_unsubscribe_form_mails_a_link_instead(app, client, outbox):
+    with app.app_context():
+        db.session.add(Subscriber(email='reader@example.com', confirmed=True))
+        db.session.commit()
+    client.post('/unsubscribe', data={'email': 'reader@example.com'})
+    client.post('/unsubscribe', data={'email': 'stranger@example.com'})
+    assert subscribers(app) == {'reader@example.com': True}
+    assert [mail[0] for mail in outbox] == ['reader@example.com']
@@ -0,0 +1,67 @@
+import json
+from collections import Counter
+from datetime import datetime
+
+from extensions import db
+from models import ArchiveMonth, Blog, Tag, find_or_create_tags, recount_post_counts
+
+
+def counters(app):
+    """The maintained counters, without the rows that have dropped to zero."""
+    with app.app_context():
+        tags = {tag.slug: tag.post_count for tag in Tag.query if tag.post_count}
+        months = {(row.year, row.month): row.post_count for row in ArchiveMonth.query if row.post_count}
+    return tags, months
+
+
+def actual(app):
+    """The same counts, taken from the posts themselves."""
+    with app.app_context():
+        posts = Blog.query.all()
+        tags = Counter(tag.slug for post in posts for tag in post.tags)
+        months = Counter((post.date_posted.year, post.date_posted.month) for post in posts)
+    return dict(tags), dict(months)
+
+
+def test_counters_follow_create_retag_move_and_delete(app, publish):
+    first = publish(tags='python, flask')
+    publish(tags='Python')
+    assert counters(app) == actual(app)
+    assert counters(app)[0] == {'python': 2, 'flask': 1}
+
+    with app.app_context():
+        blog = db.session.get(Blog, first)
+        blog.tags.remove(next(tag for tag in blog.tags if tag.slug == 'flask'))
+        blog.tags.extend(find_or_create_tags(['sqlite']))
+        blog.date_posted = datetime(2020, 2, 29)
+        db.session.commit()
+    assert counters(app) == actual(app)
+    assert counters(app)[0] == {'python': 2, 'sqlite': 1}
+
+    with app.app_context():
+        db.session.delete(db.session.get(Blog, first))
+        db.session.commit()
+    assert counters(app) == actual(app)
+    assert (2020, 2) not in counters(app)[1]
+
+
+def test_counters_follow_import(app, member, tmp_path):
+    path = tmp_path / 'posts.jsonl'
+    path.write_text(''.join(json.dumps({
+        'title': f'Imported {n}', 'content': 'x', 'author_email': 'member@example.com',
+        'date_posted': f'2019-0{n % 3 + 1}-15T12:00:00', 'tags': ['Go', 'go', 'rust'][:n % 3 + 1],
+    }) + '\n' for n in range(7)))
+    result = app.test_cli_runner().invoke(args=['blog', 'import', str(path), '--batch-size', '3'])
+    assert result.exit_code == 0, result.output
+    assert counters(app) == actual(app)
+    assert counters(app)[0] == {'go': 7, 'rust': 2}
+
+
+def test_recount_agrees(app, publish):
+    publish(tags='a, b')
+    publish(tags='b')
+    before = counters(app)
+    with app.app_context():
+        recount_post_counts(db.session)
+        db.session.commit()
+    assert counters(app) == before
@@ -0,0 +1,52 @@
+import json
+
+from extensions import db
+from models import Blog
+
+
+def export(app, path):
+    result = app.test_cli_runner().invoke(args=['blog', 'export', str(path)])
+    assert result.exit_code == 0, result.output
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_export_import_round_trip(app, publish, tmp_path):
+    publish(title='First', content='Plain text.', tags='python, flask')
+    publish(title='Second', content='# Heading\n\nSome **Markdown**.', tags='Python')
+    publish(title='Third', content='No tags at all.')
+    exported = export(app, tmp_path / 'posts.jsonl')
+    assert [record['tags'] for record in exported] == [['flask', 'python'], ['python'], []]
+
+    with app.app_context():
+        for blog in Blog.query.all():
+            db.session.delete(blog)
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['blog', 'import', str(tmp_path / 'posts.jsonl')])
+    assert result.exit_code == 0, result.output
+    assert 'Imported 3 posts' in result.output
+
+    assert export(app, tmp_path / 'again.jsonl') == exported
+    with app.app_context():
+        second = Blog.query.filter_by(title='Second').one()
+        assert '<strong>Markdown</strong>' in second.content_html
+        assert second.excerpt and second.word_count
+
+
+def test_import_skips_unknown_authors_and_resumes(app, member, tmp_path):
+    path = tmp_path / 'posts.jsonl'
+    records = [
+        {'title': 'Mine', 'content': 'x', 'author_email': 'member@example.com'},
+        {'title': 'Theirs', 'content': 'y', 'author_email': 'nobody@example.com'},
+        {'title': 'Later', 'content': 'z', 'author_email': 'member@example.com'},
+    ]
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=['blog', 'import', str(path), '--batch-size', '2'])
+    assert 'Imported 2 posts, skipped 1' in result.output
+    result = runner.invoke(args=['blog', 'import', str(path), '--resume'])
+    assert 'Imported 0 posts' in result.output  # Every batch was checkpointed
+    result = runner.invoke(args=['blog', 'import', str(path), '--on-missing-author', 'fail'])
+    assert result.exit_code != 0 and 'nobody@example.com' in result.output
+    with app.app_context():
+        assert sorted(db.session.scalars(db.select(Blog.title))) == ['Later', 'Mine']
@@ -0,0 +1,181 @@
+"""Bulk post maintenance: JSON Lines export/import and Markdown re-rendering.
+
+Each line is one post: ``{"title", "content", "date_posted", "updated_at", "author_email", "tags"}``,
+``tags`` being a list of tag names. Export streams rows from a server-side
+cursor so memory stays flat however many posts there are, reading the tags of
+each batch in one query. Import inserts in batches with a single executemany
+per batch, resolves authors by email, creates missing tags, keeps the post
+counters in step, and records a checkpoint after every committed batch so an
+interrupted run can be resumed with ``--resume``.
+
+``flask blog render`` re-renders the stored HTML of every post written by an
+older Markdown renderer (see ``rendering.py``) on a process pool.
+"""
+import json
+import os
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert, select
+
+from extensions import db
+from models import (TAG_NAME_LENGTH, Blog, Tag, User, apply_post_counts, blog_tags, find_or_create_tags, slugify,
+                    summarize_content)
+from rendering import RENDERER_VERSION, render_markdown, render_stale
+
+blog_cli = AppGroup('blog', help='Bulk post import, export and re-rendering.')
+
+
+def _format_date(value):
+    return value.isoformat() if value is not None else None
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(path, lines_done):
+    # Write-then-rename so a crash never leaves a truncated checkpoint behind
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(str(lines_done))
+    os.replace(tmp_path, path)
+
+
+@blog_cli.command('export')
+@click.argument('output', type=click.File('w'), default='-')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched per round trip.')
+def export_command(output, batch_size):
+    """Stream every post, oldest first, to OUTPUT (default stdout) as JSONL."""
+    stmt = (
+        select(Blog.id, Blog.title, Blog.content, Blog.date_posted, Blog.updated_at, User.email)
+        .join(User, Blog.author_id == User.id)
+        .order_by(Blog.id)
+    )
+    count = 0
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for rows in result.partitions():
+            tags = {}  # blog id -> tag names, one query per batch
+            for blog_id, name in connection.execute(
+                select(blog_tags.c.blog_id, Tag.name).join(Tag, Tag.id == blog_tags.c.tag_id)
+                .where(blog_tags.c.blog_id.in_([row.id for row in rows])).order_by(Tag.name)
+            ):
+                tags.setdefault(blog_id, []).append(name)
+            for row in rows:
+                output.write(json.dumps({
+                    'title': row.title,
+                    'content': row.content,
+                    'date_posted': _format_date(row.date_posted),
+                    'updated_at': _format_date(row.updated_at),
+                    'author_email': row.email,
+                    'tags': tags.get(row.id, []),
+                }) + '\n')
+                count += 1
+    click.echo(f'Exported {count} posts.', err=True)
+
+
+@blog_cli.command('import')
+@click.argument('input_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, show_default=True, help='Posts inserted per executemany.')
+@click.option('--on-missing-author', type=click.Choice(['skip', 'fail']), default='skip', show_default=True,
+              help='What to do with posts whose author_email has no account.')
+@click.option('--checkpoint', 'checkpoint_path', default=None,
+              help='Checkpoint file (default: INPUT_PATH.checkpoint).')
+@click.option('--resume', is_flag=True, help='Continue after the last committed batch.')
+def import_command(input_path, batch_size, on_missing_author, checkpoint_path, resume):
+    """Insert posts from a JSONL file produced by `flask blog export`."""
+    checkpoint_path = checkpoint_path or f'{input_path}.checkpoint'
+    start_line = _read_checkpoint(checkpoint_path) if resume else 0
+    author_ids = {}  # email -> id, or None when the account does not exist
+    imported = skipped = 0
+
+    def resolve_authors(records):
+        unknown = {record['author_email'] for record in records} - author_ids.keys()
+        if not unknown:
+            return
+        found = dict(db.session.execute(select(User.email, User.id).where(User.email.in_(unknown))).all())
+        for email in unknown:
+            author_ids[email] = found.get(email)
+
+    def flush_batch(records, lines_done):
+        nonlocal imported, skipped
+        resolve_authors(records)
+        rows, row_tags = [], []  # row_tags: the tag names of each row
+        for record in records:
+            author_id = author_ids[record['author_email']]
+            if author_id is None:
+                if on_missing_author == 'fail':
+                    raise click.ClickException(f"No user with email {record['author_email']!r}")
+                skipped += 1
+                continue
+            excerpt, word_count, reading_time = summarize_content(record['content'])
+            date_posted = _parse_date(record.get('date_posted')) or datetime.utcnow()
+            rows.append({
+                'title': record['title'],
+                'content': record['content'],
+                'content_html': render_markdown(record['content']),
+                'content_html_version': RENDERER_VERSION,
+                'excerpt': excerpt,
+                'word_count': word_count,
+                'reading_time': reading_time,
+                'date_posted': date_posted,
+                'updated_at': _parse_date(record.get('updated_at')) or date_posted,
+                'author_id': author_id,
+            })
+            row_tags.append(record.get('tags', []))
+        if rows:
+            blog_ids = db.session.scalars(insert(Blog).returning(Blog.id, sort_by_parameter_order=True), rows).all()
+            tags = {tag.slug: tag for tag in find_or_create_tags(name for names in row_tags for name in names)}
+            db.session.flush()  # Ids for the tags created just now
+            links = [{'blog_id': blog_id, 'tag_id': tags[slug].id}
+                     for blog_id, names in zip(blog_ids, row_tags)
+                     for slug in {slugify(name.strip()[:TAG_NAME_LENGTH]) for name in names} - {''}]
+            if links:
+                db.session.execute(blog_tags.insert(), links)
+            # Bulk inserts skip mapper events, so bump each author's list version here
+            users = User.__table__
+            for author_id in {row['author_id'] for row in rows}:
+                db.session.execute(
+                    users.update().where(users.c.id == author_id).values(posts_version=users.c.posts_version + 1)
+                )
+            # ...and the listener that maintains the per-month and per-tag post counts
+            apply_post_counts(db.session, Counter((row['date_posted'].year, row['date_posted'].month) for row in rows),
+                              Counter(link['tag_id'] for link in links))
+        db.session.commit()
+        _write_checkpoint(checkpoint_path, lines_done)
+        imported += len(rows)
+
+    batch = []
+    line_number = 0
+    with open(input_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if line_number <= start_line or not line.strip():
+                continue
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                flush_batch(batch, line_number)
+                batch = []
+    if batch:
+        flush_batch(batch, line_number)
+    click.echo(f'Imported {imported} posts, skipped {skipped} with unknown authors.')
+
+
+@blog_cli.command('render')
+@click.option('--workers', type=int, default=None, help='Rendering processes (default: one per CPU).')
+@click.option('--batch-size', default=500, show_default=True, help='Posts read and written per round trip.')
+@click.option('--all', 'rerender_all', is_flag=True, help='Re-render every post, not only stale ones.')
+def render_command(workers, batch_size, rerender_all):
+    """Re-render post HTML produced by an older Markdown renderer."""
+    count = render_stale(db, Blog, workers=workers, batch_size=batch_size, rerender_all=rerender_all)
+    click.echo(f'Rendered {count} posts with renderer version {RENDERER_VERSION}.')
@@ -0,0 +1,285 @@
+"""Forms and the views of the ``main`` blueprint."""
+import calendar
+import hashlib
+import time
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, abort, jsonify, make_response
+from flask_login import current_user
+from flask_security import login_required, roles_required, hash_password
+from flask_wtf import FlaskForm
+from sqlalchemy.orm import load_only, selectinload
+from werkzeug.http import HTTP_STATUS_CODES
+from wtforms import StringField, PasswordField, TextAreaField, SubmitField
+from wtforms.validators import DataRequired, Email, EqualTo, Optional
+
+from conditional import conditional, make_etag, not_modified, set_validators, conditional_allowed
+from extensions import db, security, page_cache, snapshots, job_queue, feeds
+from models import ArchiveMonth, Blog, Subscriber, Tag, blog_tags, find_or_create_tags
+from notifications import CONFIRM_SALT, UNSUBSCRIBE_SALT, read_token
+from pagination import keyset_stream, clamp_page_size
+from passwords import PasswordPoolSaturated
+from rendering import ensure_html, post_version
+from search import search_posts, fts_available
+from streaming import stream_page
+
+bp = Blueprint('main', __name__)
+
+# Forms
+class RegistrationForm(FlaskForm):
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    password = PasswordField('Password', validators=[DataRequired()])
+    confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
+    submit = SubmitField('Sign Up')
+
+class BlogForm(FlaskForm):
+    title = StringField('Title', validators=[DataRequired()])
+    content = TextAreaField('Content', validators=[DataRequired()])
+    tags = StringField('Tags', validators=[Optional()])  # Comma-separated
+    submit = SubmitField('Post')
+
+class SubscribeForm(FlaskForm):
+    email = StringField('Email', validators=[DataRequired(), Email()])
+    submit = SubmitField('Submit')
+
+# Routes
+@bp.route('/')
+@snapshots.public
+def index():
+    return render_template('index.html', title='Home')  # Render a home page with login and register buttons
+
+@bp.route('/dashboard')
+@login_required
+@conditional(lambda: (make_etag('dashboard', current_user.id, current_user.posts_version, request.query_string), None))
+def dashboard():
+    return _stream_post_list(Blog.query.filter_by(author_id=current_user.id), title='Dashboard')
+
+def _stream_post_list(query, **context):
+    # Keyset-paginated list of posts; only the columns the list shows are loaded,
+    # in batches while the page streams out
+    config = current_app.config
+    page_size = clamp_page_size(request.args.get('per_page'), config['BLOG_PAGE_SIZE'], config['BLOG_MAX_PAGE_SIZE'])
+    query = query.options(load_only(Blog.id, Blog.title, Blog.date_posted, Blog.excerpt, Blog.reading_time))
+    try:
+        page = keyset_stream(query, Blog.date_posted, Blog.id, page_size, request.args.get('after'),
+                             batch_size=config['STREAM_BATCH_SIZE'], session=db.session)
+    except ValueError:
+        abort(400)  # Malformed ?after= cursor
+    return stream_page('blog_list.html', blogs=page, **context)
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        security.datastore.create_user(email=form.email.data, password=hash_password(form.password.data),
+                                       fs_uniquifier=form.email.data)
+        db.session.commit()
+        flash('Congratulations, you are now a registered user!', 'success')
+        return redirect(url_for('main.dashboard'))
+    return render_template('register.html', title='Register', form=form)
+
+@bp.route('/blog/new', methods=['GET', 'POST'])
+@login_required
+def new_blog():
+    form = BlogForm()
+    if form.validate_on_submit():
+        blog = Blog(title=form.title.data, content=form.content.data, author=current_user,
+                    tags=find_or_create_tags((form.tags.data or '').split(',')))
+        db.session.add(blog)
+        db.session.flush()  # Assigns blog.id for the job payload
+        # Fan-out runs in the background; the jobs commit atomically with the post
+        job_queue.publish('post_published', {'blog_id': blog.id}, key=blog.id)
+        db.session.commit()
+        flash('Your blog post has been created!', 'success')
+        return redirect(url_for('main.dashboard'))
+    return render_template('create_blog.html', title='New Blog Post', form=form)
+
+@bp.route('/subscribe', methods=['GET', 'POST'])
+def subscribe():
+    form = SubscribeForm()
+    if form.validate_on_submit():
+        # Double opt-in: nothing but the confirmation link is mailed until the owner follows it.
+        # The same message either way, so the form doesn't reveal who is subscribed
+        email = form.email.data
+        if Subscriber.query.filter_by(email=email).first() is None:
+            db.session.add(Subscriber(email=email))
+        job_queue.enqueue('confirm_subscription', {'email': email}, key=_mail_key('confirm_subscription', email))
+        db.session.commit()
+        flash('Check your inbox for a link to confirm your subscription.', 'info')
+        return redirect(url_for('main.index'))
+    return render_template('subscribe.html', title='Subscribe', form=form)
+
+@bp.route('/subscribe/confirm/<token>')
+def confirm_subscription(token):
+    email = read_token(token, CONFIRM_SALT, max_age=current_app.config['SUBSCRIBE_CONFIRM_MAX_AGE'])
+    subscriber = Subscriber.query.filter_by(email=email).first() if email else None
+    if subscriber is None:
+        flash('That confirmation link is invalid or has expired.', 'danger')
+        return redirect(url_for('main.subscribe'))
+    subscriber.confirmed = True
+    db.session.commit()
+    flash('You are subscribed to new posts.', 'success')
+    return redirect(url_for('main.index'))
+
+@bp.route('/unsubscribe', methods=['GET', 'POST'])
+def unsubscribe():
+    form = SubscribeForm()
+    if form.validate_on_submit():
+        # Mails the address its own unsubscribe link rather than taking the form's word for who is asking
+        email = form.email.data
+        job_queue.enqueue('send_unsubscribe_link', {'email': email}, key=_mail_key('send_unsubscribe_link', email))
+        db.session.commit()
+        flash('If that address is subscribed, it will receive a link to unsubscribe.', 'info')
+        return redirect(url_for('main.index'))
+    return render_template('unsubscribe.html', title='Unsubscribe', form=form)
+
+@bp.route('/unsubscribe/<token>', methods=['GET', 'POST'])
+def unsubscribe_confirmed(token):
+    # The signed link in every mail. GET asks first, since mail scanners follow links; POST is the
+    # RFC 8058 one-click request mail clients send, which carries no CSRF token - the signature stands in for it
+    email = read_token(token, UNSUBSCRIBE_SALT)
+    if email is None:
+        abort(404)
+    if request.method == 'POST':
+        Subscriber.query.filter_by(email=email).delete()
+        db.session.commit()
+        flash('You will no longer receive new post notifications.', 'info')
+        return redirect(url_for('main.index'))
+    return render_template('unsubscribe.html', title='Unsubscribe', email=email)
+
+def _mail_key(job_name, email):
+    # At most one such mail per address per hour, however often the form is submitted
+    address = hashlib.sha256(email.lower().encode()).hexdigest()[:32]  # Fits the key column however long the address
+    return f'{job_name}:{address}:{int(time.time()) // 3600}'
+
+@bp.route('/blog/<int:blog_id>')
+@login_required
+def blog(blog_id):
+    # Look up only the version first so cache hits never load or render the post
+    updated_at = db.session.query(Blog.updated_at).filter_by(id=blog_id).scalar()
+    if updated_at is None:
+        abort(404)
+    cache_key, version = f'blog:{blog_id}', post_version(updated_at)
+    etag = make_etag(cache_key, version)
+    response = not_modified(etag, updated_at)  # 304 before any render when the client is current
+    if response is not None:
+        return response
+    cacheable = conditional_allowed()  # Pending flash messages are per-user and must not be cached
+    if cacheable:
+        response = snapshots.response(f'/blog/{blog_id}', version)  # Frozen and precompressed by `flask freeze --posts`
+        if response is not None:
+            return set_validators(response, etag, updated_at)
+    html = page_cache.get(cache_key, version) if cacheable else None
+    if html is None:
+        # Fully loaded, tags included: it is detached by the time the body streams
+        blog = Blog.query.options(selectinload(Blog.tags)).get_or_404(blog_id)
+        ensure_html(db, Blog, blog)  # Only rows rendered by an older RENDERER_VERSION are parsed here
+        fill_cache = (lambda page: page_cache.set(cache_key, version, page)) if cacheable else None
+        html = stream_page('blog_detail.html', on_complete=fill_cache, title=blog.title, blog=blog)
+    if not cacheable:
+        return html
+    return set_validators(make_response(html), etag, updated_at)
+
+@bp.route('/tags')
+@login_required
+def tags():
+    # Tag.post_count is kept current on every write, so the cloud is one indexed read
+    tags = (Tag.query.filter(Tag.post_count > 0)
+            .order_by(Tag.post_count.desc(), Tag.name).limit(current_app.config['TAG_LIST_SIZE']).all())
+    return render_template('tags.html', title='Tags', tags=tags)
+
+@bp.route('/tag/<slug>')
+@login_required
+def tag(slug):
+    tag = Tag.query.filter_by(slug=slug).first_or_404()
+    query = Blog.query.join(blog_tags, blog_tags.c.blog_id == Blog.id).filter(blog_tags.c.tag_id == tag.id)
+    return _stream_post_list(query, title=tag.name, heading=f'Tagged "{tag.name}"')
+
+@bp.route('/archive')
+@login_required
+def archive():
+    months = ArchiveMonth.query.filter(ArchiveMonth.post_count > 0).order_by(
+        ArchiveMonth.year.desc(), ArchiveMonth.month.desc()
+    ).all()
+    return render_template('archive.html', title='Archive', months=months, month_names=calendar.month_name)
+
+@bp.route('/archive/<int:year>/<int:month>')
+@login_required
+def archive_month(year, month):
+    try:
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+    except ValueError:
+        abort(404)
+    # A date range rather than extract(): the (date_posted, id) index answers it and the keyset order alike
+    query = Blog.query.filter(Blog.date_posted >= start, Blog.date_posted < end)
+    return _stream_post_list(query, title=start.strftime('%B %Y'), heading=start.strftime('%B %Y'))
+
+@bp.route('/search')
+@login_required
+def search():
+    q = request.args.get('q', '').strip()
+    page = clamp_page_size(request.args.get('page'), 1, current_app.config['SEARCH_MAX_PAGES'])  # Bounded page number
+    results, has_next, unavailable = [], False, not fts_available(db)
+    if q and not unavailable:
+        results, has_next = search_posts(db, q, page=page, per_page=current_app.config['SEARCH_PAGE_SIZE'])
+        has_next = has_next and page < current_app.config['SEARCH_MAX_PAGES']
+    return render_template('search.html', title='Search', q=q, page=page, results=results,
+                           has_next=has_next, unavailable=unavailable)
+
+@bp.app_errorhandler(PasswordPoolSaturated)
+def password_pool_saturated(error):
+    # Back-pressure: shed sign-up/login bursts instead of queueing them behind every other request
+    response = make_response(
+        render_template('error.html', title='Busy', error='The server is busy, please try again shortly.'), 503)
+    response.headers['Retry-After'] = '1'
+    return response
+
+# Informational pages that render nothing but their template
+STATIC_PAGES = {
+    'about': ('/about', 'About'),
+    'faq': ('/faq', 'FAQ'),
+    'help': ('/help', 'Help'),
+    'privacy_policy': ('/privacy-policy', 'Privacy Policy'),
+    'terms_and_conditions': ('/terms-and-conditions', 'Terms and Conditions'),
+    'contribute': ('/contribute', 'Contribute'),
+}
+
+def _static_page_view(name, title, **context):
+    @snapshots.public
+    @conditional(lambda: (make_etag('page', name), None))
+    def view():
+        return render_template(f'{name}.html', title=title, **context)
+    return view
+
+for _name, (_rule, _title) in STATIC_PAGES.items():
+    bp.add_url_rule(_rule, _name, _static_page_view(_name, _title))
+    snapshots.register(_rule, f'{_name}.html', title=_title)
+
+SITEMAP_URLS = ['/'] + [_rule for _rule, _ in STATIC_PAGES.values()]  # Public pages listed on /sitemap
+bp.add_url_rule('/sitemap', 'sitemap', _static_page_view('sitemap', 'Sitemap', urls=SITEMAP_URLS))
+snapshots.register('/', 'index.html', title='Home')
+snapshots.register('/sitemap', 'sitemap.html', title='Sitemap', urls=SITEMAP_URLS)
+feeds.register_urls(SITEMAP_URLS + ['/sitemap'])  # Listed in sitemap.xml ahead of the posts
+
+# Error templates that have a matching werkzeug exception (419, 425, 426, 510 and 511 have none)
+ERROR_PAGES = (401, 403, 404, 406, 410, 418, 421, 422, 428, 429, 431, 451, 500, 502, 504)
+
+def error_page(error):
+    # Anonymous visitors get the frozen copy, which also keeps 500s from touching a failing database
+    response = snapshots.error_response(error.code)
+    if response is None:
+        response = make_response(render_template(f'{error.code}.html', title=HTTP_STATUS_CODES[error.code]), error.code)
+    for name, value in error.get_headers():
+        if name != 'Content-Type':
+            response.headers[name] = value  # Retry-After on 429, WWW-Authenticate on 401
+    return response
+
+for _code in ERROR_PAGES:
+    bp.app_errorhandler(_code)(error_page)
+    snapshots.register_error(_code, f'{_code}.html', title=HTTP_STATUS_CODES[_code])
+
+@bp.route('/cache/stats')
+@roles_required('admin')
+def cache_stats():
+    return jsonify(page_cache.info())  # Hit/miss/eviction counters for sizing the page cache